@@ -1,27 +1,72 @@
 """The ical integration."""
 
+from array import array
 import asyncio
-from datetime import date, datetime, timedelta
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+import codecs
+import contextlib
+from datetime import date, datetime, timedelta, timezone
+import hashlib
+import heapq
+from itertools import islice
 import logging
+from operator import itemgetter
+import re
+from time import monotonic, perf_counter
 from urllib.parse import urlparse
+from zoneinfo import ZoneInfo
 
-import icalendar
-import recurring_ical_events
+from aiohttp import (
+    ClientError,
+    ClientResponseError,
+    ClientSession,
+    ClientTimeout,
+    InvalidURL,
+    TCPConnector,
+    hdrs,
+)
 
-from homeassistant.components.calendar import CalendarEvent
+from homeassistant.components.calendar import CalendarEvent, extract_offset
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_NAME, CONF_URL, CONF_VERIFY_SSL
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.util import Throttle, dt as dt_util
+from homeassistant.const import (
+    CONF_NAME,
+    CONF_TIMEOUT,
+    CONF_URL,
+    CONF_VERIFY_SSL,
+    EVENT_HOMEASSISTANT_CLOSE,
+)
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.aiohttp_client import SERVER_SOFTWARE
+from homeassistant.util import dt as dt_util, ssl as ssl_util
 
 from .const import (
+    CONF_CATEGORIES,
     CONF_DAYS,
+    CONF_DUPLICATE_PRECEDENCE,
+    CONF_EXCLUDE,
+    CONF_INCLUDE,
+    CONF_MAX_COMPONENTS,
     CONF_MAX_EVENTS,
+    CONF_MAX_FEED_SIZE,
+    CONF_MAX_OCCURRENCES,
     CONF_UPDATE_INTERVAL,
+    COUNT_THIS_WEEK,
+    COUNT_TODAY,
+    COUNT_TOMORROW,
+    DEFAULT_DUPLICATE_PRECEDENCE,
+    DEFAULT_MAX_COMPONENTS,
+    DEFAULT_MAX_FEED_SIZE,
+    DEFAULT_MAX_OCCURRENCES,
+    DEFAULT_TIMEOUT,
     DEFAULT_UPDATE_INTERVAL,
     DOMAIN,
+    DUPLICATES_KEEP_ALL,
+    DUPLICATES_SEQUENCE,
+    OFFSET,
 )
+from .view import ICalExportView
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -31,17 +76,652 @@ PLATFORMS = ["sensor", "calendar"]
 # Number of days of past events to keep for the calendar entity
 CALENDAR_HISTORY_DAYS = 30
 
+# Size of the chunks read from a feed while it is streamed in
+FETCH_CHUNK_SIZE = 64 * 1024
+
+# The client shared by all feeds keeps at most this many connections per
+# host, keeps idle ones open for reuse and caches DNS lookups, in seconds
+DATA_SESSION = f"{DOMAIN}_session"
+FETCH_LIMIT_PER_HOST = 4
+KEEPALIVE_TIMEOUT = 60
+DNS_CACHE_TTL = 300
+
+VEVENT_MARKER = b"BEGIN:VEVENT"
+
+# Properties that make a VEVENT part of a series needing recurrence expansion
+RECURRENCE_PROPERTIES = ("RRULE", "RDATE", "EXDATE", "RECURRENCE-ID")
+
+# Raw VEVENT blocks, folded lines and the properties the pre-parse scan
+# looks at to decide whether a block can fall inside the window
+VEVENT_BLOCK = re.compile(rb"^BEGIN:VEVENT\r?$.*?^END:VEVENT\r?$\n?", re.M | re.S)
+FOLDED_LINE = re.compile(rb"\r?\n[ \t]")
+SCAN_PROPERTY = re.compile(
+    rb"^(DTSTART|DTEND|DURATION|RRULE|RDATE|RECURRENCE-ID)[;:]([^\r\n]*)", re.M
+)
+
+# The scan compares wall-clock times without resolving timezones, so the
+# window is widened by more than any UTC offset
+SCAN_SLACK = timedelta(days=1)
+
+# Time between two occurrences for each RRULE frequency. MONTHLY and
+# YEARLY are left out: periods without the start's day, such as February
+# for a series on the 31st, are skipped, so COUNT does not bound them
+RRULE_PERIODS = {
+    b"SECONDLY": timedelta(seconds=1),
+    b"MINUTELY": timedelta(minutes=1),
+    b"HOURLY": timedelta(hours=1),
+    b"DAILY": timedelta(days=1),
+    b"WEEKLY": timedelta(days=7),
+}
+
+
+# Timezone implementations whose conversions are already done in C
+FAST_TZINFOS = (timezone, ZoneInfo)
+
+# Step and reach, in seconds, used to find the UTC offset transitions
+# around an instant, and the distance from a transition within which
+# conversions are left to the timezone itself (ambiguous/missing times)
+TZ_PROBE_STEP = 28 * 86400
+TZ_PROBE_REACH = 400 * 86400
+TZ_SAFETY_MARGIN = 86400
+
+# Days expanded first when the horizon is sized automatically, and the
+# factor it grows by while fewer than max_events events are to come
+AUTO_DAYS_INITIAL = 7
+AUTO_DAYS_GROWTH = 4
+# Days looked ahead at most when the horizon is sized automatically
+AUTO_DAYS_MAX = 365
+
+# Fields of an event dict shown by the entities
+EVENT_FIELDS = ("summary", "start", "end", "location", "description", "all_day")
+
+# PRODID of the documents served by the export view
+EXPORT_PRODID = "-//tybritten//ical-sensor-homeassistant//EN"
+
+# Seconds a host is left alone after its first failed fetch; the pause
+# doubles with every further failure up to BACKOFF_MAX
+BACKOFF_INITIAL = 60
+BACKOFF_MAX = 3600
+
+# Errors that mean a feed could not be fetched right now
+FETCH_ERRORS = (ClientError, asyncio.TimeoutError, OSError)
+
+
+class FeedLimitExceeded(HomeAssistantError):
+    """Error to indicate a feed is larger than the configured limits."""
+
+
+class FeedUnavailable(HomeAssistantError):
+    """Error to indicate a feed could not be fetched."""
+
+
+class FeedInvalid(HomeAssistantError):
+    """Error to indicate a feed could not be parsed."""
+
+
+def _describe_fetch_error(err: Exception) -> str:
+    """Describe why a fetch failed without the URL of the feed.
+
+    Private feed URLs carry an access token, and the description ends up in
+    the log and in the state attributes.
+    """
+    if isinstance(err, ClientResponseError):
+        return f"HTTP {err.status} {err.message}".rstrip()
+    if isinstance(err, InvalidURL):
+        return "Invalid URL"
+    return str(err) or type(err).__name__
+
+
+class _HostBreaker:
+    """Circuit breaker shared by all feeds served by one host.
+
+    Every fetch failing because of the host, not one of its feeds, opens
+    the circuit for twice as long as the one before, up to BACKOFF_MAX.
+    While it is open no request is sent to the host; the first request
+    after that is a trial that either closes the circuit again or opens it
+    for longer.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a closed circuit."""
+        self.failures = 0
+        self.retry_at = 0.0
+        self.error = None
+
+    def check(self) -> None:
+        """Raise FeedUnavailable while the circuit is open."""
+        if monotonic() < self.retry_at:
+            raise FeedUnavailable(self.error)
+
+    def record_failure(self, err: Exception) -> FeedUnavailable:
+        """Open the circuit after a failed fetch and return the error to raise."""
+        delay = min(BACKOFF_MAX, BACKOFF_INITIAL * 2**self.failures)
+        self.failures += 1
+        self.retry_at = monotonic() + delay
+        self.error = f"{_describe_fetch_error(err)}, retrying in {delay} s"
+        return FeedUnavailable(self.error)
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful fetch."""
+        self.failures = 0
+        self.retry_at = 0.0
+        self.error = None
+
+
+def _is_host_failure(err: ClientResponseError) -> bool:
+    """Return whether an HTTP error means the host, not one feed, is failing.
+
+    Server errors and rate limiting open the circuit of the host; a missing
+    or forbidden feed is the problem of that feed only.
+    """
+    return err.status >= 500 or err.status == 429
+
+
+# Circuit breakers by host, shared by every calendar fetching from it
+_HOST_BREAKERS: dict = {}
+
+
+def _host_breaker(url: str) -> _HostBreaker:
+    """Return the circuit breaker of the host serving a feed."""
+    key = urlparse(url).netloc.lower() or url
+    breaker = _HOST_BREAKERS.get(key)
+    if breaker is None:
+        breaker = _HOST_BREAKERS[key] = _HostBreaker()
+    return breaker
+
+
+class _ZoneTransitions:
+    """UTC offset intervals of a timezone, learned as they are needed.
+
+    Timezones built from a VTIMEZONE component are pure Python and
+    evaluate their rules on every utcoffset() call. Once the transitions
+    around an instant are known, converting any wall-clock time in the same
+    interval is plain offset arithmetic.
+    """
+
+    def __init__(self, tz) -> None:
+        """Initialize an empty cache for a timezone."""
+        self._tz = tz
+        self._starts = []
+        self._intervals = []
+
+    def timestamp(self, value: datetime) -> float:
+        """Return the POSIX timestamp of an aware datetime in this zone."""
+        wall = value.replace(tzinfo=timezone.utc).timestamp()
+        index = bisect_right(self._starts, wall) - 1
+        if index >= 0:
+            _, end, offset = self._intervals[index]
+            if wall < end:
+                return value.timestamp() if offset is None else wall - offset
+        return self._learn(value, wall)
+
+    def _offset(self, ts: float) -> float:
+        """Return the UTC offset of the zone at a timestamp, in seconds."""
+        return datetime.fromtimestamp(ts, self._tz).utcoffset().total_seconds()
+
+    def _transition(self, ts: float, offset: float, step: int) -> float:
+        """Return the last instant with the same offset in the direction of step.
+
+        The result is within an hour of the actual transition, or at
+        TZ_PROBE_REACH from ts if the offset does not change before that.
+        """
+        inside = ts
+        while abs(inside - ts) < TZ_PROBE_REACH:
+            outside = inside + step
+            if self._offset(outside) != offset:
+                break
+            inside = outside
+        else:
+            return inside
+        while abs(outside - inside) > 3600:
+            middle = (inside + outside) / 2
+            if self._offset(middle) == offset:
+                inside = middle
+            else:
+                outside = middle
+        return inside
+
+    def _learn(self, value: datetime, wall: float) -> float:
+        """Convert the slow way and remember the surrounding interval.
+
+        Wall-clock times close to a transition may be ambiguous or missing,
+        so they are remembered as an interval left to the timezone itself.
+        """
+        ts = value.timestamp()
+        offset = wall - ts
+        start = self._transition(ts, offset, -TZ_PROBE_STEP) + offset
+        end = self._transition(ts, offset, TZ_PROBE_STEP) + offset
+        if start + TZ_SAFETY_MARGIN <= wall < end - TZ_SAFETY_MARGIN:
+            interval = (start + TZ_SAFETY_MARGIN, end - TZ_SAFETY_MARGIN, offset)
+        else:
+            edge = start if wall < start + TZ_SAFETY_MARGIN else end
+            interval = (edge - TZ_SAFETY_MARGIN, edge + TZ_SAFETY_MARGIN, None)
+        index = bisect_right(self._starts, interval[0])
+        self._starts.insert(index, interval[0])
+        self._intervals.insert(index, interval)
+        return ts
+
+
+# Learned transitions per timezone object. icalendar caches the timezones
+# it builds from VTIMEZONE components by TZID, so these are shared by all
+# occurrences and all feeds using the same zone.
+_ZONE_TRANSITIONS: dict = {}
+
+
+def _as_local(value: datetime) -> datetime:
+    """Convert an aware datetime to the Home Assistant timezone."""
+    local_tz = dt_util.DEFAULT_TIME_ZONE
+    tz = value.tzinfo
+    if tz is local_tz:
+        return value
+    if isinstance(tz, FAST_TZINFOS):
+        return value.astimezone(local_tz)
+    transitions = _ZONE_TRANSITIONS.get(tz)
+    if transitions is None:
+        transitions = _ZONE_TRANSITIONS[tz] = _ZoneTransitions(tz)
+    return datetime.fromtimestamp(transitions.timestamp(value), local_tz)
+
 
 def check_event(d: datetime, all_day: bool) -> datetime | date:
     """Return date object for all-day events, datetime otherwise."""
     return d.date() if all_day else d
 
 
+def _is_wide_charset(charset: str) -> bool:
+    """Return True for encodings where a zero byte is not a NUL character."""
+    return codecs.lookup(charset).name.startswith(("utf-16", "utf-32"))
+
+
+def _scan_time(value: bytes) -> datetime | None:
+    """Return the wall-clock time of a raw DATE or DATE-TIME value."""
+    value = value.strip()
+    try:
+        if len(value) == 8:
+            return datetime(int(value[:4]), int(value[4:6]), int(value[6:8]))
+        return datetime(
+            int(value[:4]),
+            int(value[4:6]),
+            int(value[6:8]),
+            int(value[9:11]),
+            int(value[11:13]),
+            int(value[13:15]),
+        )
+    except ValueError:
+        return None
+
+
+def _scan_series_start(rrule: bytes, start: datetime) -> datetime | None:
+    """Return the latest start an RRULE can produce, None if unbounded."""
+    try:
+        parts = dict(part.split(b"=", 1) for part in rrule.strip().split(b";"))
+    except ValueError:
+        return None
+    if b"UNTIL" in parts:
+        return _scan_time(parts[b"UNTIL"])
+    period = RRULE_PERIODS.get(parts.get(b"FREQ"))
+    # BYxxx parts can make occurrences rarer than FREQ, so COUNT only
+    # bounds the series when there are none
+    if b"COUNT" not in parts or period is None or any(
+        name.startswith(b"BY") for name in parts
+    ):
+        return None
+    try:
+        steps = (int(parts[b"COUNT"]) - 1) * int(parts.get(b"INTERVAL", b"1"))
+    except ValueError:
+        return None
+    return start + period * max(steps, 0)
+
+
+def _block_may_overlap(block: bytes, low: datetime, high: datetime) -> bool:
+    """Return False if a raw VEVENT block certainly falls outside the window.
+
+    Anything the scan cannot decide on (overrides, RDATEs, unbounded or
+    unreadable rules and values) is kept for the full parser.
+    """
+    props = {}
+    for name, rest in SCAN_PROPERTY.findall(FOLDED_LINE.sub(b"", block)):
+        props.setdefault(name, rest.rsplit(b":", 1)[-1])
+    if b"RECURRENCE-ID" in props or b"RDATE" in props or b"DTSTART" not in props:
+        return True
+    start = _scan_time(props[b"DTSTART"])
+    if start is None:
+        return True
+    if b"DTEND" in props:
+        end = _scan_time(props[b"DTEND"])
+    elif b"DURATION" in props:
+        import icalendar
+
+        try:
+            end = start + icalendar.vDuration.from_ical(props[b"DURATION"].decode())
+        except (ValueError, UnicodeDecodeError):
+            end = None
+    else:
+        end = start + timedelta(days=1) if len(props[b"DTSTART"].strip()) == 8 else start
+    if end is None:
+        return True
+
+    first, last = sorted((start, end))
+    if first >= high:
+        return False
+    if b"RRULE" in props:
+        series_start = _scan_series_start(props[b"RRULE"], start)
+        if series_start is None:
+            return True
+        last = series_start + (last - start)
+    return last >= low
+
+
+def _prefilter_payload(payload, from_date: datetime, to_date: datetime):
+    """Drop raw VEVENT blocks that cannot intersect the window.
+
+    Returns the payload itself when nothing was dropped.
+    """
+    low = from_date.astimezone(timezone.utc).replace(tzinfo=None) - SCAN_SLACK
+    high = to_date.astimezone(timezone.utc).replace(tzinfo=None) + SCAN_SLACK
+    view = memoryview(payload)
+    parts = []
+    kept_from = 0
+    for match in VEVENT_BLOCK.finditer(payload):
+        if not _block_may_overlap(match.group(), low, high):
+            parts.append(view[kept_from : match.start()])
+            kept_from = match.end()
+    if not parts:
+        return payload
+    parts.append(view[kept_from:])
+    return b"".join(parts)
+
+
+def _decode(data, charset: str) -> str:
+    """Decode part of a feed, dropping NUL characters."""
+    text = str(data, charset, "replace")
+    if "\x00" in text:
+        text = text.replace("\x00", "")
+    return text
+
+
+def _parse_payload(payload: bytearray, charset: str, from_date=None, to_date=None):
+    """Decode a feed payload and parse it into an icalendar object.
+
+    Runs in the executor. When a window is given, VEVENT blocks that cannot
+    intersect it are dropped before the full parse. For ASCII compatible
+    charsets NUL bytes were already dropped while the payload was streamed
+    in; for UTF-16/32 they are only recognisable after decoding, so strip
+    them here.
+
+    Parsing the whole feed at once keeps its text, all of its unfolded
+    lines and the tree in memory together. For ASCII compatible charsets
+    the calendar without its VEVENTs is parsed first, so VTIMEZONEs are
+    known, and then the VEVENT blocks one by one.
+    """
+    # The parsing stack is only imported here, in the executor, so loading
+    # the integration and rendering its config flow do not pay for it
+    import icalendar
+
+    if _is_wide_charset(charset):
+        return icalendar.Calendar.from_ical(_decode(payload, charset))
+    if from_date is not None:
+        payload = _prefilter_payload(payload, from_date, to_date)
+    spans = [match.span() for match in VEVENT_BLOCK.finditer(payload)]
+    view = memoryview(payload)
+    bounds = [0, *(bound for span in spans for bound in span), len(payload)]
+    skeleton = b"".join(
+        view[start:end] for start, end in zip(bounds[::2], bounds[1::2])
+    )
+    calendar = icalendar.Calendar.from_ical(_decode(skeleton, charset))
+    del skeleton
+    for start, end in spans:
+        calendar.add_component(
+            icalendar.Event.from_ical(_decode(view[start:end], charset))
+        )
+    return calendar
+
+
+def _is_recurring(components) -> bool:
+    """Return True if the VEVENTs sharing a UID need recurrence expansion."""
+    return len(components) > 1 or any(
+        prop in components[0] for prop in RECURRENCE_PROPERTIES
+    )
+
+
+def _single_occurrence(component, from_date, to_date):
+    """Yield the occurrence of a non-recurring VEVENT if it is in the window."""
+    import recurring_ical_events
+
+    occurrence = recurring_ical_events.Occurrence(
+        recurring_ical_events.EventAdapter(component)
+    )
+    if occurrence.is_in_span(from_date, to_date):
+        yield occurrence
+
+
+def _expand_occurrences(
+    calendar, from_date, to_date, max_occurrences: int, event_filter=None
+):
+    """Expand the events of a calendar between two dates.
+
+    Runs in the executor. Only VEVENTs that are part of a series go through
+    the recurrence engine; one-off events are window-filtered directly.
+    Series are expanded one occurrence at a time so the expansion stops as
+    soon as more than max_occurrences are produced.
+
+    With an EventFilter, series none of whose components match are dropped
+    before expansion; occurrences of the remaining series are checked one
+    by one, as modified occurrences may have their own summary.
+    """
+    import icalendar
+    import recurring_ical_events
+
+    groups = defaultdict(list)
+    for component in calendar.walk("VEVENT"):
+        groups[component.get("UID", str(id(component)))].append(component)
+    groups = [(uid, comps, _is_recurring(comps)) for uid, comps in groups.items()]
+    if event_filter is not None:
+        groups = [
+            group for group in groups if any(map(event_filter.matches, group[1]))
+        ]
+
+    # X-WR-TIMEZONE changes the times of every event, leave it to the engine
+    fast_path = "X-WR-TIMEZONE" not in calendar
+    series = {}
+    if not fast_path:
+        series_calendar = calendar
+    elif any(recurring for _, _, recurring in groups):
+        series_calendar = icalendar.Calendar(calendar)
+        series_calendar.subcomponents = [
+            component
+            for _, components, recurring in groups
+            if recurring
+            for component in components
+        ]
+    else:
+        series_calendar = None
+    if series_calendar is not None:
+        query = recurring_ical_events.of(series_calendar, skip_bad_series=True)
+        series = {item.uid: item for item in query.series}
+
+    occurrences = []
+    for uid, components, recurring in groups:
+        if fast_path and not recurring:
+            found = _single_occurrence(components[0], from_date, to_date)
+        elif uid in series:
+            found = series[uid].between(from_date, to_date)
+        else:
+            continue
+        check = event_filter is not None and (recurring or not fast_path)
+        with contextlib.suppress(*recurring_ical_events.CalendarQuery.suppressed_errors):
+            for occurrence in found:
+                component = occurrence.as_component(False)
+                if not recurring:
+                    # as_component() stamps every occurrence with its start
+                    # as RECURRENCE-ID; a one-off event has none, so that a
+                    # rescheduled copy of it still matches the original
+                    del component["RECURRENCE-ID"]
+                if check and not event_filter.matches(component):
+                    continue
+                if len(occurrences) >= max_occurrences:
+                    raise FeedLimitExceeded(
+                        f"Feed expands to more than {max_occurrences} occurrences"
+                    )
+                occurrences.append(component)
+    return occurrences
+
+
+def _probe_payload(
+    payload, charset: str, from_date, to_date, max_occurrences: int, event_filter
+):
+    """Parse and expand a payload, returning the occurrences and seconds taken.
+
+    Runs in the executor, so the time is not skewed by the event loop.
+    """
+    started = perf_counter()
+    calendar = _parse_payload(payload, charset, from_date, to_date)
+    occurrences = _expand_occurrences(
+        calendar, from_date, to_date, max_occurrences, event_filter
+    )
+    return len(occurrences), perf_counter() - started
+
+
+def _serialize_events(events, name: str) -> bytes:
+    """Write event dicts as an iCalendar document, one VEVENT per occurrence.
+
+    Times are written in UTC so no VTIMEZONE is needed. Occurrences of a
+    series get the time of their RECURRENCE-ID appended to the UID, as
+    overrides without their master event are dropped by many clients.
+    DTSTAMP is left out for the caller to add, so unchanged events give
+    the same bytes.
+    """
+    import icalendar
+
+    calendar = icalendar.Calendar()
+    calendar.add("prodid", EXPORT_PRODID)
+    calendar.add("version", "2.0")
+    calendar.add("x-wr-calname", name)
+    for event in events:
+        component = icalendar.Event()
+        uid, recurrence_id = event.get("uid"), event.get("recurrence_id")
+        if uid is not None and recurrence_id is not None:
+            if isinstance(recurrence_id, datetime):
+                if recurrence_id.tzinfo is not None:
+                    recurrence_id = dt_util.as_utc(recurrence_id)
+                uid = f"{uid}-{recurrence_id:%Y%m%dT%H%M%S}"
+            else:
+                uid = f"{uid}-{recurrence_id:%Y%m%d}"
+        if uid is not None:
+            component.add("uid", uid)
+        if event["all_day"]:
+            component.add("dtstart", event["start"].date())
+            component.add("dtend", event["end"].date())
+        else:
+            component.add("dtstart", dt_util.as_utc(event["start"]))
+            component.add("dtend", dt_util.as_utc(event["end"]))
+        component.add("summary", event["summary"])
+        for key in ("location", "description"):
+            if event.get(key):
+                component.add(key, event[key])
+        if event.get("sequence"):
+            component.add("sequence", event["sequence"])
+        calendar.add_component(component)
+    return calendar.to_ical()
+
+
+def _deduplicate(event_lists, precedence: str):
+    """Drop events that appear in several of the given per-source lists.
+
+    Events are identified by UID and RECURRENCE-ID. With the "sequence"
+    precedence the copy with the highest SEQUENCE wins and ties go to the
+    earlier source; with "source_order" the earlier source always wins.
+    Uses a single hash index, so the cost is linear in the number of events.
+    """
+    best = {}
+    for index, events in enumerate(event_lists):
+        for event in events:
+            key = (event.get("uid"), event.get("recurrence_id"))
+            if key[0] is None:
+                continue
+            rank = -index
+            if precedence == DUPLICATES_SEQUENCE:
+                rank = (_sequence(event), rank)
+            current = best.get(key)
+            if current is None or rank > current[0]:
+                best[key] = (rank, event)
+    return [
+        [
+            event
+            for event in events
+            if event.get("uid") is None
+            or best[(event["uid"], event.get("recurrence_id"))][1] is event
+        ]
+        for events in event_lists
+    ]
+
+
+def _shared(strings: dict, value):
+    """Return the copy of a text property already held in ``strings``.
+
+    Occurrences, overrides and one-off events that carry the same text
+    then point at a single plain ``str`` instead of a ``vText`` each.
+    """
+    if value is None:
+        return None
+    text = str(value)
+    return strings.setdefault(text, text)
+
+
+def event_fingerprint(event):
+    """Return the parts of an event dict entities show, None for no event.
+
+    Entities keep the fingerprint of what they show in _fingerprint and
+    compare it with the one of a new event to skip rebuilding and writing
+    a state that would not change.
+    """
+    if event is None:
+        return None
+    return tuple(map(event.get, EVENT_FIELDS))
+
+
+def _sequence(event) -> int:
+    """Return the SEQUENCE of an event dict, 0 if missing or invalid."""
+    try:
+        return int(event.get("sequence", 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+@callback
+def _async_get_session(hass: HomeAssistant) -> ClientSession:
+    """Return the client shared by every feed of the integration.
+
+    Feeds on the same host reuse its warm connections instead of each
+    opening their own, and no more than FETCH_LIMIT_PER_HOST requests go to
+    one host at a time. Certificate checks are chosen per request.
+    """
+    session = hass.data.get(DATA_SESSION)
+    if session is None:
+
+        async def _async_close_session(event: Event) -> None:
+            """Close the client when Home Assistant shuts down."""
+            await hass.data[DATA_SESSION].close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close_session)
+    if session is None or session.closed:
+        connector = TCPConnector(
+            ssl=ssl_util.get_default_context(),
+            limit_per_host=FETCH_LIMIT_PER_HOST,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=DNS_CACHE_TTL,
+        )
+        session = hass.data[DATA_SESSION] = ClientSession(
+            connector=connector, headers={hdrs.USER_AGENT: SERVER_SOFTWARE}
+        )
+    return session
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up ical from a config entry."""
     config = {**entry.data, **entry.options}
     if DOMAIN not in hass.data:
         hass.data[DOMAIN] = {}
+        hass.http.register_view(ICalExportView())
 
     update_interval = config.get(CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL)
     hass.data[DOMAIN][entry.entry_id] = ICalEvents(
@@ -64,10 +744,140 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id)
+        if not hass.data[DOMAIN] and DATA_SESSION in hass.data:
+            await hass.data[DATA_SESSION].close()
 
     return unload_ok
 
 
+class EventFilter:
+    """Include and exclude rules for the events of a calendar.
+
+    include and exclude are regular expressions searched, ignoring case, in
+    the summary, location and categories of an event; categories is a
+    comma separated list of which an event needs to have at least one.
+    """
+
+    def __init__(self, include=None, exclude=None, categories=None) -> None:
+        """Compile the rules; empty ones are left out."""
+        self.include = re.compile(include, re.I) if include else None
+        self.exclude = re.compile(exclude, re.I) if exclude else None
+        self.categories = {
+            category.strip().casefold()
+            for category in (categories or "").split(",")
+            if category.strip()
+        }
+
+    def __bool__(self) -> bool:
+        """Return True if there is any rule to apply."""
+        return bool(self.include or self.exclude or self.categories)
+
+    def matches(self, component) -> bool:
+        """Return True if a VEVENT component passes all rules."""
+        categories = _categories(component)
+        if self.categories and not self.categories.intersection(
+            category.casefold() for category in categories
+        ):
+            return False
+        if self.include is None and self.exclude is None:
+            return True
+        texts = [
+            str(component.get("SUMMARY", "")),
+            str(component.get("LOCATION", "")),
+            *categories,
+        ]
+        if self.include is not None and not any(map(self.include.search, texts)):
+            return False
+        return self.exclude is None or not any(map(self.exclude.search, texts))
+
+
+def _categories(component) -> list[str]:
+    """Return the categories of a VEVENT over all its CATEGORIES lines."""
+    value = component.get("CATEGORIES")
+    if value is None:
+        return []
+    values = value if isinstance(value, list) else [value]
+    return [str(category) for item in values for category in item.cats]
+
+
+class _Timeline:
+    """Start and end times of a calendar's events as arrays of epoch seconds.
+
+    starts follows the calendar, which is sorted by start; ends is sorted
+    on its own. Counting the events that overlap a period is then two
+    bisections instead of a loop over the event dicts: the events starting
+    before its end, minus those already over at its start.
+    """
+
+    def __init__(self, calendar) -> None:
+        """Index the start and end of every event."""
+        self.starts = array("d", [event["start"].timestamp() for event in calendar])
+        ends = array("d", [event["end"].timestamp() for event in calendar])
+        self.ends = array("d", sorted(ends))
+
+    def count(self, start: float, end: float) -> int:
+        """Return how many events overlap the period, start before end."""
+        return bisect_left(self.starts, end) - bisect_right(self.ends, start)
+
+    def count_at(self, when: float) -> int:
+        """Return how many events are on at an instant."""
+        return bisect_right(self.starts, when) - bisect_right(self.ends, when)
+
+
+class _DayBuckets:
+    """Event counts per local day around one day, for the count sensors.
+
+    days holds the events touching each day from the Monday of the week
+    of today on, spans those touching the seven days from each of them.
+    Spans are counted on their own, so an event lasting several days is
+    counted once per period rather than once per day.
+    """
+
+    def __init__(self, timeline: _Timeline, today: date) -> None:
+        """Count the days and spans the count sensors can ask for."""
+        self.today = today
+        self._offset = today.weekday()
+        monday = today - timedelta(days=self._offset)
+        bounds = [
+            dt_util.start_of_local_day(monday + timedelta(days=day)).timestamp()
+            for day in range(self._offset + 15)
+        ]
+        self.days = [timeline.count(*period) for period in zip(bounds, bounds[1:])]
+        self.spans = [timeline.count(*period) for period in zip(bounds, bounds[7:])]
+
+    def count(self, period: str) -> int:
+        """Return the events of today, tomorrow, this week or the next 7 days."""
+        if period == COUNT_TODAY:
+            return self.days[self._offset]
+        if period == COUNT_TOMORROW:
+            return self.days[self._offset + 1]
+        if period == COUNT_THIS_WEEK:
+            return self.spans[0]
+        return self.spans[self._offset]
+
+
+class FeedSource:
+    """One feed of a calendar and the events last parsed from it.
+
+    The events are kept together with the validators and digest of the
+    payload they came from, so an unchanged feed is not parsed again.
+    """
+
+    def __init__(self, url: str) -> None:
+        """Initialize a feed source."""
+        parts = urlparse(url)
+        if parts.scheme == "webcal":
+            url = parts.geturl().replace("webcal", "https", 1)
+        self.url = url
+        self.breaker = _host_breaker(url)
+        self.etag = None
+        self.last_modified = None
+        self.digest = None
+        self.window = None
+        self.events = []
+        self.last_success = None
+
+
 class ICalEvents:
     """Get a list of events."""
 
@@ -76,21 +886,196 @@ class ICalEvents:
         self.hass = hass
         self.name = config.get(CONF_NAME)
         self.url = config.get(CONF_URL)
+        self.sources = [FeedSource(url) for url in (self.url or "").split()]
         self.max_events = config.get(CONF_MAX_EVENTS)
         self.days = config.get(CONF_DAYS)
         self.verify_ssl = config.get(CONF_VERIFY_SSL)
+        self.timeout = ClientTimeout(total=config.get(CONF_TIMEOUT, DEFAULT_TIMEOUT))
+        self.max_feed_size = (
+            config.get(CONF_MAX_FEED_SIZE, DEFAULT_MAX_FEED_SIZE) * 1024
+        )
+        self.max_components = config.get(CONF_MAX_COMPONENTS, DEFAULT_MAX_COMPONENTS)
+        self.max_occurrences = config.get(
+            CONF_MAX_OCCURRENCES, DEFAULT_MAX_OCCURRENCES
+        )
+        self.duplicate_precedence = config.get(
+            CONF_DUPLICATE_PRECEDENCE, DEFAULT_DUPLICATE_PRECEDENCE
+        )
+        self.event_filter = EventFilter(
+            config.get(CONF_INCLUDE),
+            config.get(CONF_EXCLUDE),
+            config.get(CONF_CATEGORIES),
+        ) or None
+        self.error = None
+        self._generation = 0
+        self._timeline = None
+        self._buckets = None
         self.calendar = []
+        self.upcoming = []
         self.event = None
         self.all_day = False
-        self.update = Throttle(timedelta(seconds=update_interval))(self._do_update)
+        self._listeners = []
+        self.update_interval = update_interval
+        self._refreshed_at = None
+        self._refresh = None
+        # Text of the events built during the current refresh
+        self._strings = {}
+        # Generation of the calendar the export was built from, its bytes
+        # and its ETag
+        self._export = None
+        self._export_lock = asyncio.Lock()
+
+    @property
+    def calendar(self):
+        """Return the events of all feeds, sorted by start."""
+        return self._calendar
+
+    @calendar.setter
+    def calendar(self, events):
+        """Replace the events; what is derived from them is rebuilt lazily."""
+        self._calendar = events
+        self._generation += 1
+        self._timeline = None
+        self._buckets = None
+
+    @property
+    def timeline(self) -> _Timeline:
+        """Return the start and end index of the current events."""
+        if self._timeline is None:
+            self._timeline = _Timeline(self._calendar)
+        return self._timeline
+
+    def count_events(self, start: datetime, end: datetime) -> int:
+        """Return how many events overlap a period."""
+        return self.timeline.count(start.timestamp(), end.timestamp())
+
+    def count_events_at(self, when: datetime) -> int:
+        """Return how many events are on at an instant."""
+        return self.timeline.count_at(when.timestamp())
+
+    def daily_counts(self, first_day: date, days: int) -> list[int]:
+        """Return how many events touch each local day from first_day on."""
+        timeline = self.timeline
+        bounds = [
+            dt_util.start_of_local_day(first_day + timedelta(days=day)).timestamp()
+            for day in range(days + 1)
+        ]
+        return [timeline.count(*period) for period in zip(bounds, bounds[1:])]
+
+    def event_count(self, period: str) -> int:
+        """Return how many events touch one of the COUNT_PERIODS.
+
+        The counts are bucketed once per refresh and day, so reading them
+        is a lookup.
+        """
+        today = dt_util.now().date()
+        if self._buckets is None or self._buckets.today != today:
+            self._buckets = _DayBuckets(self.timeline, today)
+        return self._buckets.count(period)
+
+    @callback
+    def async_add_listener(self, update_callback):
+        """Register a callback receiving the upcoming events.
+
+        Returns a function removing the callback again.
+        """
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener():
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_update_listeners(self):
+        """Work out the upcoming events once and hand them to all listeners."""
+        now = dt_util.now()
+        self.upcoming = list(
+            islice((e for e in self.calendar if e["end"] > now), self.max_events)
+        )
+        for update_callback in self._listeners:
+            update_callback(self.upcoming)
+
+    async def update(self):
+        """Refresh the events unless that was done within the update interval.
+
+        Callers arriving while a refresh is running wait for that refresh and
+        get its outcome, instead of returning early with the events from
+        before it or starting a second one.
+        """
+        if self._refresh is None:
+            now = monotonic()
+            if (
+                self._refreshed_at is not None
+                and now - self._refreshed_at < self.update_interval
+            ):
+                return
+            self._refreshed_at = now
+            self._refresh = self.hass.async_create_background_task(
+                self._async_refresh_once(), f"{DOMAIN} {self.name} refresh"
+            )
+        # A caller being cancelled must not cancel the refresh for the others
+        await asyncio.shield(self._refresh)
+
+    async def _async_refresh_once(self):
+        """Run one refresh shared by every caller of update()."""
+        try:
+            await self._do_update()
+        finally:
+            self._refresh = None
+
+    @property
+    def fetched(self):
+        """Return whether any feed was fetched since the start."""
+        return any(source.last_success is not None for source in self.sources)
+
+    @property
+    def last_success(self):
+        """Return when all feeds were last fetched, None if one never was.
+
+        While a feed cannot be fetched its last good events are still
+        served, so this tells how stale the calendar may be.
+        """
+        times = [source.last_success for source in self.sources]
+        if not times or None in times:
+            return None
+        return min(times)
+
+    async def async_export(self):
+        """Return the events as an iCalendar document and its ETag.
+
+        The document is built for the first request after a refresh and
+        then served as is. If the events did not change, the previous bytes
+        and ETag are kept, so clients revalidating get a 304.
+        """
+        async with self._export_lock:
+            calendar, generation = self.calendar, self._generation
+            if self._export is None or self._export[0] != generation:
+                body = await self.hass.async_add_executor_job(
+                    _serialize_events, calendar, self.name
+                )
+                etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+                if self._export is not None and self._export[2] == etag:
+                    body = self._export[1]
+                else:
+                    stamp = dt_util.utcnow().strftime("%Y%m%dT%H%M%SZ").encode()
+                    body = body.replace(
+                        b"BEGIN:VEVENT\r\n",
+                        b"BEGIN:VEVENT\r\nDTSTAMP:" + stamp + b"\r\n",
+                    )
+                self._export = (generation, body, etag)
+            return self._export[1], self._export[2]
 
     async def async_get_events(self, hass: HomeAssistant, start_date, end_date):
         """Get list of upcoming events."""
         events = []
         if len(self.calendar) > 0:
-            for event in self.calendar:
+            # The events are sorted by start, those from stop on start later
+            stop = bisect_left(self.timeline.starts, end_date.timestamp())
+            for event in islice(self.calendar, stop):
 
-                if event["start"] < end_date and event["end"] > start_date:
+                if event["end"] > start_date:
                     events.append(
                         CalendarEvent(
                             check_event(event["start"], event["all_day"]),
@@ -103,31 +1088,88 @@ class ICalEvents:
                     # events.append(event)
         return events
 
-    async def _do_update(self):
-        """Update list of upcoming events."""
-        parts = urlparse(self.url)
+    async def _async_fetch(self, source: FeedSource):
+        """Stream a feed into a single cleaned buffer.
+
+        Remote feeds are requested with the compressed transfer encodings
+        aiohttp can decode (gzip/deflate, and brotli when installed); the
+        body is decompressed chunk by chunk while it is read, and NUL bytes
+        are dropped per chunk so no second copy of the payload is made.
+        Returns the payload, the charset to decode it with, a digest of its
+        content and its ETag and Last-Modified validators; the payload is
+        None when the server reports the feed as not modified. The
+        validators are left for the caller to store once the payload was
+        parsed. Raises FeedLimitExceeded as soon as the size or component
+        limits are crossed, without reading the rest of the feed.
+        """
+        payload = bytearray()
+        digest = hashlib.blake2b(digest_size=16)
+        components = 0
+
+        def append(chunk):
+            nonlocal components
+            scan_from = max(0, len(payload) - len(VEVENT_MARKER) + 1)
+            payload.extend(chunk)
+            digest.update(chunk)
+            if len(payload) > self.max_feed_size:
+                raise FeedLimitExceeded(
+                    f"Feed is larger than {self.max_feed_size // 1024} kB"
+                )
+            components += payload.count(VEVENT_MARKER, scan_from)
+            if components > self.max_components:
+                raise FeedLimitExceeded(
+                    f"Feed has more than {self.max_components} events"
+                )
+
+        parts = urlparse(source.url)
         if parts.scheme == "file":
-            with open(parts.path) as f:
-                text = f.read()
-        else:
-            if parts.scheme == "webcal":
-                self.url = parts.geturl().replace("webcal", "https", 1)
-            session = async_get_clientsession(self.hass, verify_ssl=self.verify_ssl)
-            async with session.get(self.url) as response:
-                text = await response.text()
-        if text is not None:
-            loop = asyncio.get_running_loop()
-            event_list = await loop.run_in_executor(
-                None, icalendar.Calendar.from_ical, text.replace("\x00", "")
-            )
-            start_of_events = dt_util.start_of_local_day() - timedelta(
-                days=CALENDAR_HISTORY_DAYS
-            )
-            end_of_events = dt_util.start_of_local_day() + timedelta(days=self.days)
+            with open(parts.path, "rb") as f:
+                while chunk := f.read(FETCH_CHUNK_SIZE):
+                    append(chunk.replace(b"\x00", b""))
+            return payload, "utf-8", digest.digest(), (None, None)
 
-            self.calendar = await self._ical_parser(
-                event_list, start_of_events, end_of_events
+        headers = {}
+        if source.etag:
+            headers[hdrs.IF_NONE_MATCH] = source.etag
+        if source.last_modified:
+            headers[hdrs.IF_MODIFIED_SINCE] = source.last_modified
+        session = _async_get_session(self.hass)
+        async with session.get(
+            source.url,
+            headers=headers,
+            timeout=self.timeout,
+            ssl=self.verify_ssl is not False,
+        ) as response:
+            if response.status == 304:
+                return None, None, source.digest, (source.etag, source.last_modified)
+            response.raise_for_status()
+            validators = (
+                response.headers.get(hdrs.ETAG),
+                response.headers.get(hdrs.LAST_MODIFIED),
             )
+            charset = response.charset or "utf-8"
+            wide = _is_wide_charset(charset)
+            async for chunk in response.content.iter_chunked(FETCH_CHUNK_SIZE):
+                append(chunk if wide else chunk.replace(b"\x00", b""))
+            return payload, charset, digest.digest(), validators
+
+    async def _do_update(self):
+        """Update list of upcoming events.
+
+        If a feed crosses one of the configured limits, cannot be fetched or
+        cannot be parsed its previous events are kept and the reason is
+        stored in self.error.
+        """
+        try:
+            await self._async_refresh_calendar()
+        except (FeedLimitExceeded, FeedUnavailable, FeedInvalid) as err:
+            if str(err) != self.error:
+                _LOGGER.error("Keeping previous events for %s: %s", self.name, err)
+            self.error = str(err)
+        else:
+            if self.error is not None:
+                _LOGGER.info("Events of %s are up to date again", self.name)
+            self.error = None
 
         if len(self.calendar) > 0:
             found_next_event = False
@@ -136,17 +1178,172 @@ class ICalEvents:
                     self.event = event
                     found_next_event = True
 
+    def _window(self):
+        """Return the period events are expanded for.
+
+        With days set to 0 this is the longest automatic horizon.
+        """
+        start_of_day = dt_util.start_of_local_day()
+        return (
+            start_of_day - timedelta(days=CALENDAR_HISTORY_DAYS),
+            start_of_day + timedelta(days=self.days or AUTO_DAYS_MAX),
+        )
+
+    async def async_probe(self):
+        """Fetch, parse and expand every feed once without keeping the events.
+
+        Used by the config and options flows to show what a calendar costs
+        before it is saved. The configured limits apply, so the probe is
+        bounded like a refresh. Fetch errors are raised as they are.
+        """
+        from_date, to_date = self._window()
+        probe = {"size": 0, "components": 0, "occurrences": 0, "parse_time": 0.0}
+        # Fresh sources, so no validators are sent
+        for source in [FeedSource(source.url) for source in self.sources]:
+            payload, charset, _, _ = await self._async_fetch(source)
+            probe["size"] += len(payload)
+            probe["components"] += payload.count(VEVENT_MARKER)
+            occurrences, parse_time = await self.hass.async_add_executor_job(
+                _probe_payload,
+                payload,
+                charset,
+                from_date,
+                to_date,
+                self.max_occurrences,
+                self.event_filter,
+            )
+            del payload
+            probe["occurrences"] += occurrences
+            probe["parse_time"] += parse_time
+        return probe
+
+    async def _async_refresh_calendar(self):
+        """Refresh all feeds concurrently and merge their events.
+
+        Every source keeps its own sorted event list, so the merged
+        calendar is a k-way merge of them rather than a sort.
+        """
+        start_of_events, end_of_events = self._window()
+        try:
+            results = await asyncio.gather(
+                *(
+                    self._async_refresh_source(source, start_of_events, end_of_events)
+                    for source in self.sources
+                ),
+                return_exceptions=True,
+            )
+        finally:
+            self._strings = {}
+        feed_errors = []
+        for result in results:
+            if isinstance(result, (FeedLimitExceeded, FeedUnavailable, FeedInvalid)):
+                feed_errors.append(result)
+            elif isinstance(result, BaseException):
+                raise result
+
+        event_lists = [source.events for source in self.sources]
+        if len(event_lists) > 1 and self.duplicate_precedence != DUPLICATES_KEEP_ALL:
+            event_lists = _deduplicate(event_lists, self.duplicate_precedence)
+        self.calendar = list(heapq.merge(*event_lists, key=itemgetter("start")))
+        if feed_errors:
+            raise feed_errors[0]
+
+    async def _async_refresh_source(self, source: FeedSource, from_date, to_date):
+        """Fetch a feed and parse it unless it is unchanged since last time."""
+        window = (from_date, to_date)
+        if window != source.window:
+            # The cached events are for another window, so a "not modified"
+            # answer would be of no use
+            source.etag = source.last_modified = None
+        source.breaker.check()
+        try:
+            payload, charset, digest, validators = await self._async_fetch(source)
+        except ClientResponseError as err:
+            if not _is_host_failure(err):
+                # The host answered, only this feed is missing or refused,
+                # so other feeds on the host are still fetched
+                source.breaker.record_success()
+                raise FeedUnavailable(_describe_fetch_error(err)) from err
+            raise source.breaker.record_failure(err) from err
+        except FETCH_ERRORS as err:
+            raise source.breaker.record_failure(err) from err
+        source.breaker.record_success()
+        if payload is None or (digest == source.digest and window == source.window):
+            source.etag, source.last_modified = validators
+            source.last_success = dt_util.utcnow()
+            return
+        if not payload:
+            raise FeedInvalid("Feed is empty")
+        try:
+            calendar = await self.hass.async_add_executor_job(
+                _parse_payload, payload, charset, from_date, to_date
+            )
+            del payload
+            # Hand the parse tree over to the parser without keeping a
+            # reference here, so it is freed as soon as it has been expanded
+            parser = self._ical_parser(calendar, from_date, to_date)
+            del calendar
+            source.events = await parser
+        except ValueError as err:
+            raise FeedInvalid(f"Feed is not valid iCalendar: {err}") from err
+        # The validators are only stored along with the events parsed from
+        # the payload, so a "not modified" answer never confirms a payload
+        # that crossed a limit or could not be parsed
+        source.etag, source.last_modified = validators
+        source.digest = digest
+        source.window = window
+        source.last_success = dt_util.utcnow()
+
     async def _ical_parser(self, calendar, from_date, to_date):
-        """Return a sorted list of events from a icalendar object."""
-        events = []
+        """Return a sorted list of events from a icalendar object.
 
-        recurring_events = await self.hass.async_add_executor_job(
-            lambda: recurring_ical_events.of(calendar, skip_bad_series=True).between(
-                from_date, to_date
+        The calendar is dropped once it has been expanded and every expanded
+        component once its event dict is built, so the parse tree, the
+        occurrences and the event dicts are not all alive at the same time.
+
+        With days set to 0 the horizon is sized automatically: the feed is
+        expanded for AUTO_DAYS_INITIAL days, then for AUTO_DAYS_GROWTH times
+        as many, until max_events of its events are still to come at the end
+        of today or to_date is reached. Dense calendars then expand days
+        instead of a year. The events are kept until the window moves on the
+        next day, so events ending today do not count towards max_events.
+        """
+        start_of_day = from_date + timedelta(days=CALENDAR_HISTORY_DAYS)
+        horizon = to_date
+        if not self.days:
+            horizon = min(start_of_day + timedelta(days=AUTO_DAYS_INITIAL), to_date)
+
+        while True:
+            recurring_events = await self.hass.async_add_executor_job(
+                _expand_occurrences,
+                calendar,
+                from_date,
+                horizon,
+                self.max_occurrences,
+                self.event_filter,
             )
-        )
+            if horizon >= to_date:
+                del calendar
+            events = self._event_dicts(recurring_events, from_date)
+            if horizon >= to_date:
+                break
+            end_of_day = start_of_day + timedelta(days=1)
+            if sum(event["end"] > end_of_day for event in events) >= self.max_events:
+                break
+            horizon = min(
+                start_of_day + (horizon - start_of_day) * AUTO_DAYS_GROWTH, to_date
+            )
+
+        events.sort(key=itemgetter("start"))
+        return events
 
-        for event in recurring_events:
+    def _event_dicts(self, recurring_events, from_date):
+        """Turn expanded components into event dicts, emptying their list."""
+        events = []
+
+        recurring_events.reverse()
+        while recurring_events:
+            event = recurring_events.pop()
             dtstart = event["DTSTART"].dt
             dtend = event["DTEND"].dt if "DTEND" in event else dtstart
 
@@ -181,7 +1378,7 @@ class ICalEvents:
             if event_dict:
                 events.append(event_dict)
 
-        return sorted(events, key=lambda k: k["start"])
+        return events
 
     def _ical_event_dict(self, start, end, from_date, event):
         """Build event dict from a parsed iCal event."""
@@ -197,6 +1394,8 @@ class ICalEvents:
             )
             return None
 
+        local_start = _as_local(start)
+        recurrence_id = event.get("RECURRENCE-ID")
         # Only log if we're at debug level to avoid performance impact
         if _LOGGER.isEnabledFor(logging.DEBUG):
             _LOGGER.debug(
@@ -204,16 +1403,26 @@ class ICalEvents:
                 str(start),
                 str(start.tzinfo),
                 dt_util.DEFAULT_TIME_ZONE,
-                start.astimezone(dt_util.DEFAULT_TIME_ZONE),
+                local_start,
             )
+        summary = _shared(self._strings, event.get("SUMMARY", "Unknown"))
         event_dict = {
-            "summary": event.get("SUMMARY", "Unknown"),
-            "start": start.astimezone(dt_util.DEFAULT_TIME_ZONE),
-            "end": end.astimezone(dt_util.DEFAULT_TIME_ZONE),
-            "location": event.get("LOCATION"),
-            "description": event.get("DESCRIPTION"),
+            "summary": summary,
+            "start": local_start,
+            "end": _as_local(end),
+            "location": _shared(self._strings, event.get("LOCATION")),
+            "description": _shared(self._strings, event.get("DESCRIPTION")),
             "all_day": self.all_day,
+            "uid": event.get("UID"),
+            "recurrence_id": getattr(recurrence_id, "dt", recurrence_id),
+            "sequence": event.get("SEQUENCE", 0),
         }
+        if OFFSET in summary:
+            # Parsed once here instead of by the calendar entity on every update
+            clean_summary, offset = extract_offset(summary, OFFSET)
+            if offset:
+                event_dict["clean_summary"] = _shared(self._strings, clean_summary)
+                event_dict["offset"] = offset
         # Only log if we're at debug level to avoid performance impact
         if _LOGGER.isEnabledFor(logging.DEBUG):
             _LOGGER.debug("Event to add: %s", str(event_dict))
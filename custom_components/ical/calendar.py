@@ -1,25 +1,24 @@
 """Support for iCal-URLs."""
 
-import copy
 import logging
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 
 from homeassistant.components.calendar import (
     ENTITY_ID_FORMAT,
     CalendarEntity,
     CalendarEvent,
-    extract_offset,
     is_offset_reached,
 )
 from homeassistant.const import CONF_NAME
+from homeassistant.core import callback
 from homeassistant.helpers.entity import generate_entity_id
+from homeassistant.helpers.event import async_track_point_in_time
 
+from . import event_fingerprint
 from .const import DOMAIN
 
 _LOGGER = logging.getLogger(__name__)
 
-OFFSET = "!!"
-
 
 def check_event(d: datetime, all_day: bool) -> datetime | date:
     """Return date object for all-day events, datetime otherwise."""
@@ -42,11 +41,19 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
         unique_id=f"{config_entry.entry_id}_calendar",
     )
 
-    async_add_entities([calendar], True)
+    async_add_entities([calendar])
 
 
 class ICalCalendarEventDevice(CalendarEntity):
-    """A device for getting the next Task from a WebDav Calendar."""
+    """A device for getting the next Task from a WebDav Calendar.
+
+    Like the sensors it is not polled; ICalEvents pushes every refresh to
+    it, and its state is only written when what it shows has changed.
+    """
+
+    _attr_should_poll = False
+    # Changes on every successful refresh
+    _unrecorded_attributes = frozenset({"last_success"})
 
     def __init__(self, hass, name, entity_id, ical_events, *, unique_id: str):
         """Create the iCal Calendar Event Device."""
@@ -56,11 +63,18 @@ class ICalCalendarEventDevice(CalendarEntity):
         self._name = name
         self._offset_reached = False
         self.ical_events = ical_events
+        self._unsub_offset = None
+        self._fingerprint = None
+        self._error = None
 
     @property
     def extra_state_attributes(self):
         """Return the device state attributes."""
-        return {"offset_reached": self._offset_reached}
+        return {
+            "offset_reached": self._offset_reached,
+            "error": self.ical_events.error,
+            "last_success": self.ical_events.last_success,
+        }
 
     @property
     def event(self):
@@ -72,6 +86,26 @@ class ICalCalendarEventDevice(CalendarEntity):
         """Return the name of the entity."""
         return self._name
 
+    async def async_added_to_hass(self):
+        """Start receiving updates.
+
+        The first event is pushed by the background refresh of the sensor
+        platform, so startup does not wait for the calendar server.
+        """
+        self.async_on_remove(
+            self.ical_events.async_add_listener(self._async_handle_upcoming)
+        )
+
+    async def async_will_remove_from_hass(self):
+        """Stop waiting for the offset of the shown event."""
+        self._cancel_offset_timer()
+
+    @callback
+    def _async_handle_upcoming(self, upcoming):
+        """Show the next event after a refresh, if anything changed."""
+        if self._set_event(self.ical_events.event):
+            self.async_write_ha_state()
+
     async def async_get_events(self, hass, start_date, end_date):
         """Get all events in a specific time frame."""
         _LOGGER.debug("Running ICalCalendarEventDevice async get events")
@@ -81,24 +115,50 @@ class ICalCalendarEventDevice(CalendarEntity):
         """Update event data."""
         _LOGGER.debug("Running ICalCalendarEventDevice async update for %s", self.name)
         await self.ical_events.update()
-        event = copy.deepcopy(self.ical_events.event)
-        if event is None:
-            self._event = event
-            return
-        summary, offset = extract_offset(event["summary"], OFFSET)
-        event["summary"] = summary
-        self._offset_reached = is_offset_reached(event["start"], offset)
-        self._event = CalendarEvent(
-            check_event(event["start"], event["all_day"]),
-            check_event(event["end"], event["all_day"]),
-            event["summary"],
-            event["description"],
-            event["location"],
-        )
-        # strongly typed class required.
-        # self._event = copy.deepcopy(event)
-        # self._event["start"] = {}
-        # self._event["end"] = {}
-        # self._event["start"]["dateTime"] = event["start"].isoformat()
-        # self._event["end"]["dateTime"] = event["end"].isoformat()
-        # self._event["all_day"] = event["all_day"]
+        self._set_event(self.ical_events.event)
+
+    def _set_event(self, event) -> bool:
+        """Show an event, or nothing, and return whether the state changed.
+
+        The event is only rebuilt when its fingerprint changed. Its offset
+        was parsed when the feed was, and offset_reached is flipped by a
+        timer at the exact moment instead of being checked on every update.
+        """
+        fingerprint = event_fingerprint(event)
+        changed = fingerprint != self._fingerprint
+        if changed:
+            self._fingerprint = fingerprint
+            self._event = None
+            self._cancel_offset_timer()
+            if event is not None:
+                self._event = CalendarEvent(
+                    check_event(event["start"], event["all_day"]),
+                    check_event(event["end"], event["all_day"]),
+                    event.get("clean_summary", event["summary"]),
+                    event["description"],
+                    event["location"],
+                )
+                offset = event.get("offset", timedelta())
+                self._offset_reached = is_offset_reached(event["start"], offset)
+                if offset and not self._offset_reached:
+                    self._unsub_offset = async_track_point_in_time(
+                        self.hass, self._async_reach_offset, event["start"] + offset
+                    )
+        # last_success moves on every refresh, so it is only written along
+        # with another change
+        changed |= self.ical_events.error != self._error
+        self._error = self.ical_events.error
+        return changed
+
+    @callback
+    def _async_reach_offset(self, now):
+        """Flip offset_reached when the offset of the shown event is reached."""
+        self._unsub_offset = None
+        self._offset_reached = True
+        self.async_write_ha_state()
+
+    def _cancel_offset_timer(self):
+        """Stop waiting for the offset of the event shown until now."""
+        if self._unsub_offset is not None:
+            self._unsub_offset()
+            self._unsub_offset = None
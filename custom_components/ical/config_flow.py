@@ -1,26 +1,63 @@
 """Config flow for ical integration."""
 import logging
+import math
+import re
 
+from aiohttp import ClientResponseError
 import voluptuous as vol
 
 from homeassistant import config_entries, core, exceptions
-from homeassistant.const import CONF_NAME, CONF_URL, CONF_VERIFY_SSL
+from homeassistant.const import CONF_NAME, CONF_TIMEOUT, CONF_URL, CONF_VERIFY_SSL
 import homeassistant.helpers.config_validation as cv
 
+from . import FETCH_ERRORS, FeedLimitExceeded, ICalEvents
 from .const import (
+    CONF_CATEGORIES,
+    CONF_COUNT_SENSORS,
     CONF_DATE_FORMAT,
     CONF_DAYS,
+    CONF_DESCRIPTION_LENGTH,
+    CONF_DUPLICATE_PRECEDENCE,
+    CONF_EXCLUDE,
+    CONF_INCLUDE,
+    CONF_MAX_COMPONENTS,
     CONF_MAX_EVENTS,
+    CONF_MAX_FEED_SIZE,
+    CONF_MAX_OCCURRENCES,
     CONF_UPDATE_INTERVAL,
     DEFAULT_DATE_FORMAT,
     DEFAULT_DAYS,
+    DEFAULT_DESCRIPTION_LENGTH,
+    DEFAULT_DUPLICATE_PRECEDENCE,
+    DEFAULT_MAX_COMPONENTS,
     DEFAULT_MAX_EVENTS,
+    DEFAULT_MAX_FEED_SIZE,
+    DEFAULT_MAX_OCCURRENCES,
+    DEFAULT_TIMEOUT,
     DEFAULT_UPDATE_INTERVAL,
     DOMAIN,
+    DUPLICATE_PRECEDENCES,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
+# Suggested settings keep a refresh from using more than this share of
+# the time for parsing, or more than this many bytes per second on average
+PROBE_MAX_PARSE_SHARE = 0.01
+PROBE_MAX_TRANSFER_RATE = 1024
+
+# Expanded occurrences above which looking fewer days ahead is suggested
+PROBE_TARGET_OCCURRENCES = 2000
+
+PROBE_PLACEHOLDERS = (
+    "size",
+    "components",
+    "occurrences",
+    "parse_time",
+    CONF_UPDATE_INTERVAL,
+    CONF_DAYS,
+)
+
 # TODO adjust the data schema to the data that you need
 # DATA_SCHEMA = vol.Schema({CONF_NAME: cv.string, CONF_URL: cv.url, CONF_MAX_EVENTS: cv.positive_int, CONF_DAYS: cv.positive_int, CONF_VERIFY_SSL: cv.boolean})
 DATA_SCHEMA = vol.Schema(
@@ -34,46 +71,91 @@ DATA_SCHEMA = vol.Schema(
 )
 
 
-class PlaceholderHub:
-    """Placeholder class to make tests pass.
-
-    TODO Remove this placeholder class and replace with things from your PyPI package.
-    """
-
-    def __init__(self, host):
-        """Initialize."""
-        self.host = host
-
-    async def authenticate(self, username, password) -> bool:
-        """Test if we can authenticate with the host."""
-        return True
+def regex(value):
+    """Validate a regular expression, keeping it as a string."""
+    value = cv.string(value)
+    try:
+        re.compile(value)
+    except re.error as err:
+        raise vol.Invalid(f"Invalid regular expression: {err}") from err
+    return value
+
+
+def suggest_settings(probe, days: int):
+    """Suggest an update interval and days ahead for a probed calendar."""
+    interval = max(
+        DEFAULT_UPDATE_INTERVAL,
+        probe["parse_time"] / PROBE_MAX_PARSE_SHARE,
+        probe["size"] / PROBE_MAX_TRANSFER_RATE,
+    )
+    # 0, an automatic horizon, already stops expanding once enough is found
+    if days and probe["occurrences"] > PROBE_TARGET_OCCURRENCES:
+        days = max(1, days * PROBE_TARGET_OCCURRENCES // probe["occurrences"])
+    return {
+        CONF_UPDATE_INTERVAL: math.ceil(interval / 60) * 60,
+        CONF_DAYS: days,
+    }
 
 
 async def validate_input(hass: core.HomeAssistant, data):
-    """Validate the user input allows us to connect.
+    """Validate the user input by probing the feeds.
 
     Data has the keys from DATA_SCHEMA with values provided by the user.
+    The feeds are fetched, parsed and expanded once within the configured
+    limits; the returned info holds what that cost and suggested settings.
     """
-    # TODO validate the data can be used to set up a connection.
-
-    # If your PyPI package is not built with async, pass your methods
-    # to the executor:
-    # await hass.async_add_executor_job(
-    #     your_validate_func, data["username"], data["password"]
-    # )
-
-    hub = PlaceholderHub(data["name"])
-
-    if not await hub.authenticate(data["url"], data["url"]):
-        raise InvalidAuth
+    try:
+        probe = await ICalEvents(hass=hass, config=data).async_probe()
+    except ClientResponseError as err:
+        if err.status in (401, 403):
+            raise InvalidAuth from err
+        raise CannotConnect from err
+    except FETCH_ERRORS as err:
+        raise CannotConnect from err
+    except FeedLimitExceeded as err:
+        raise FeedTooLarge from err
+    except ValueError as err:
+        raise InvalidFeed from err
+
+    return {
+        "title": data[CONF_NAME],
+        "url": data.get(CONF_URL),
+        "probe": probe,
+        "suggested": suggest_settings(probe, data.get(CONF_DAYS, DEFAULT_DAYS)),
+    }
 
-    # If you cannot connect:
-    # throw CannotConnect
-    # If the authentication is wrong:
-    # InvalidAuth
 
-    # Return info that you want to store in the config entry.
-    return {"title": data[CONF_NAME], "url": data[CONF_URL]}
+async def _async_validate(hass: core.HomeAssistant, data, errors):
+    """Run validate_input, storing the reason in errors if it fails."""
+    try:
+        return await validate_input(hass, data)
+    except CannotConnect:
+        errors["base"] = "cannot_connect"
+    except InvalidAuth:
+        errors["base"] = "invalid_auth"
+    except FeedTooLarge:
+        errors["base"] = "feed_too_large"
+    except InvalidFeed:
+        errors["base"] = "invalid_feed"
+    except Exception:  # pylint: disable=broad-except
+        _LOGGER.exception("Unexpected exception")
+        errors["base"] = "unknown"
+    return None
+
+
+def _probe_placeholders(info):
+    """Return the description placeholders showing a probe result."""
+    if info is None:
+        return dict.fromkeys(PROBE_PLACEHOLDERS, "-")
+    probe = info["probe"]
+    return {
+        "size": str(math.ceil(probe["size"] / 1024)),
+        "components": str(probe["components"]),
+        "occurrences": str(probe["occurrences"]),
+        "parse_time": f"{probe['parse_time']:.2f}",
+        CONF_UPDATE_INTERVAL: str(info["suggested"][CONF_UPDATE_INTERVAL]),
+        CONF_DAYS: str(info["suggested"][CONF_DAYS]),
+    }
 
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -86,26 +168,48 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Get the options flow for this handler."""
         return OptionsFlowHandler()
 
+    def __init__(self) -> None:
+        """Initialize the config flow."""
+        self._data = None
+        self._info = None
+
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
         errors = {}
         if user_input is not None:
-            try:
-                info = await validate_input(self.hass, user_input)
-
-                return self.async_create_entry(title=info["title"], data=user_input)
-            except CannotConnect:
-                errors["base"] = "cannot_connect"
-            except InvalidAuth:
-                errors["base"] = "invalid_auth"
-            except Exception:  # pylint: disable=broad-except
-                _LOGGER.exception("Unexpected exception")
-                errors["base"] = "unknown"
+            info = await _async_validate(self.hass, user_input, errors)
+            if info is not None:
+                self._data = user_input
+                self._info = info
+                return await self.async_step_probe()
 
         return self.async_show_form(
             step_id="user", data_schema=DATA_SCHEMA, errors=errors
         )
 
+    async def async_step_probe(self, user_input=None):
+        """Show what the feeds cost and confirm the suggested settings."""
+        if user_input is not None:
+            return self.async_create_entry(
+                title=self._info["title"], data={**self._data, **user_input}
+            )
+
+        suggested = self._info["suggested"]
+        return self.async_show_form(
+            step_id="probe",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_UPDATE_INTERVAL, default=suggested[CONF_UPDATE_INTERVAL]
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_DAYS, default=suggested[CONF_DAYS]
+                    ): cv.positive_int,
+                }
+            ),
+            description_placeholders=_probe_placeholders(self._info),
+        )
+
 
 class CannotConnect(exceptions.HomeAssistantError):
     """Error to indicate we cannot connect."""
@@ -115,16 +219,26 @@ class InvalidAuth(exceptions.HomeAssistantError):
     """Error to indicate there is invalid auth."""
 
 
+class FeedTooLarge(exceptions.HomeAssistantError):
+    """Error to indicate the feed crosses the configured limits."""
+
+
+class InvalidFeed(exceptions.HomeAssistantError):
+    """Error to indicate the URL does not serve an iCal feed."""
+
+
 class OptionsFlowHandler(config_entries.OptionsFlow):
     """Handle options flow for ical."""
 
     async def async_step_init(self, user_input=None):
-        """Manage the options."""
+        """Manage the options, showing what the feeds currently cost."""
         if user_input is not None:
             return self.async_create_entry(title="", data=user_input)
 
         options = self.config_entry.options
         data = self.config_entry.data
+        errors = {}
+        info = await _async_validate(self.hass, {**data, **options}, errors)
 
         return self.async_show_form(
             step_id="init",
@@ -150,12 +264,62 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                             CONF_DATE_FORMAT, DEFAULT_DATE_FORMAT
                         ),
                     ): cv.string,
+                    vol.Optional(
+                        CONF_DESCRIPTION_LENGTH,
+                        default=options.get(
+                            CONF_DESCRIPTION_LENGTH, DEFAULT_DESCRIPTION_LENGTH
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_COUNT_SENSORS,
+                        default=options.get(CONF_COUNT_SENSORS, False),
+                    ): cv.boolean,
                     vol.Optional(
                         CONF_UPDATE_INTERVAL,
                         default=options.get(
-                            CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL
+                            CONF_UPDATE_INTERVAL,
+                            data.get(CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL),
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_TIMEOUT,
+                        default=options.get(CONF_TIMEOUT, DEFAULT_TIMEOUT),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_MAX_FEED_SIZE,
+                        default=options.get(
+                            CONF_MAX_FEED_SIZE, DEFAULT_MAX_FEED_SIZE
                         ),
                     ): cv.positive_int,
+                    vol.Optional(
+                        CONF_MAX_COMPONENTS,
+                        default=options.get(
+                            CONF_MAX_COMPONENTS, DEFAULT_MAX_COMPONENTS
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_MAX_OCCURRENCES,
+                        default=options.get(
+                            CONF_MAX_OCCURRENCES, DEFAULT_MAX_OCCURRENCES
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_DUPLICATE_PRECEDENCE,
+                        default=options.get(
+                            CONF_DUPLICATE_PRECEDENCE, DEFAULT_DUPLICATE_PRECEDENCE
+                        ),
+                    ): vol.In(DUPLICATE_PRECEDENCES),
+                    vol.Optional(
+                        CONF_INCLUDE, default=options.get(CONF_INCLUDE, "")
+                    ): regex,
+                    vol.Optional(
+                        CONF_EXCLUDE, default=options.get(CONF_EXCLUDE, "")
+                    ): regex,
+                    vol.Optional(
+                        CONF_CATEGORIES, default=options.get(CONF_CATEGORIES, "")
+                    ): cv.string,
                 }
             ),
+            errors=errors,
+            description_placeholders=_probe_placeholders(info),
         )
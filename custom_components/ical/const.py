@@ -7,10 +7,48 @@ CONF_MAX_EVENTS = "max_events"
 CONF_DAYS = "days"
 CONF_DATE_FORMAT = "date_format"
 CONF_UPDATE_INTERVAL = "update_interval"
+CONF_MAX_FEED_SIZE = "max_feed_size"
+CONF_MAX_COMPONENTS = "max_components"
+CONF_MAX_OCCURRENCES = "max_occurrences"
+CONF_DUPLICATE_PRECEDENCE = "duplicate_precedence"
+CONF_INCLUDE = "include"
+CONF_EXCLUDE = "exclude"
+CONF_CATEGORIES = "categories"
+CONF_DESCRIPTION_LENGTH = "description_length"
+CONF_COUNT_SENSORS = "count_sensors"
 
 ICON = "mdi:calendar"
+# Marks the offset in a summary, "Dentist !!-30" is reached 30 min early
+OFFSET = "!!"
 DEFAULT_NAME = "iCal Sensor"
 DEFAULT_MAX_EVENTS = 5
 DEFAULT_DAYS = 365
 DEFAULT_DATE_FORMAT = "%-d %B %Y"
 DEFAULT_UPDATE_INTERVAL = 120
+# Seconds a feed may take to download
+DEFAULT_TIMEOUT = 30
+# Characters of the description shown by a sensor, 0 for all of them
+DEFAULT_DESCRIPTION_LENGTH = 0
+
+# Which copy of an event found in several feeds of a calendar is kept
+DUPLICATES_SEQUENCE = "sequence"
+DUPLICATES_SOURCE_ORDER = "source_order"
+DUPLICATES_KEEP_ALL = "keep_all"
+DUPLICATE_PRECEDENCES = [
+    DUPLICATES_SEQUENCE,
+    DUPLICATES_SOURCE_ORDER,
+    DUPLICATES_KEEP_ALL,
+]
+DEFAULT_DUPLICATE_PRECEDENCE = DUPLICATES_SEQUENCE
+# Size of a feed in kilobytes and number of VEVENT blocks / expanded
+# occurrences at which a refresh is aborted
+DEFAULT_MAX_FEED_SIZE = 20480
+DEFAULT_MAX_COMPONENTS = 20000
+DEFAULT_MAX_OCCURRENCES = 20000
+
+# Periods the optional count sensors count the events of
+COUNT_TODAY = "today"
+COUNT_TOMORROW = "tomorrow"
+COUNT_THIS_WEEK = "this_week"
+COUNT_NEXT_7_DAYS = "next_7_days"
+COUNT_PERIODS = [COUNT_TODAY, COUNT_TOMORROW, COUNT_THIS_WEEK, COUNT_NEXT_7_DAYS]
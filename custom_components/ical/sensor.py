@@ -3,17 +3,33 @@
 from datetime import datetime, timedelta
 import logging
 
-from homeassistant.components.sensor import SensorEntity
-from homeassistant.const import CONF_NAME
-from homeassistant.core import HomeAssistant
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.const import CONF_NAME, STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import HomeAssistant, State, callback
 from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.util import dt as dt_util
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import CONF_DATE_FORMAT, CONF_MAX_EVENTS, DEFAULT_DATE_FORMAT, DOMAIN, ICON
+from . import event_fingerprint
+from .const import (
+    CONF_COUNT_SENSORS,
+    CONF_DATE_FORMAT,
+    CONF_DESCRIPTION_LENGTH,
+    CONF_MAX_EVENTS,
+    COUNT_PERIODS,
+    DEFAULT_DATE_FORMAT,
+    DEFAULT_DESCRIPTION_LENGTH,
+    DOMAIN,
+    ICON,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# How often the sensors of a calendar are refreshed together
+SCAN_INTERVAL = timedelta(seconds=30)
+
 
 async def async_setup_entry(
     hass: HomeAssistant, config_entry, async_add_entities: AddEntitiesCallback
@@ -23,12 +39,11 @@ async def async_setup_entry(
     name = config.get(CONF_NAME)
     max_events = config.get(CONF_MAX_EVENTS)
     date_format = config.get(CONF_DATE_FORMAT, DEFAULT_DATE_FORMAT)
+    description_length = config.get(
+        CONF_DESCRIPTION_LENGTH, DEFAULT_DESCRIPTION_LENGTH
+    )
 
     ical_events = hass.data[DOMAIN][config_entry.entry_id]
-    await ical_events.update()
-    if ical_events.calendar is None:
-        _LOGGER.error("Unable to fetch iCal")
-        return False
 
     # Migrate old name-based unique_ids to entry_id-based
     ent_reg = er.async_get(hass)
@@ -47,29 +62,61 @@ async def async_setup_entry(
                 hass, ical_events, DOMAIN + " " + name, eventnumber,
                 entry_id=config_entry.entry_id,
                 date_format=date_format,
+                description_length=description_length,
+            )
+        )
+    if config.get(CONF_COUNT_SENSORS):
+        sensors.extend(
+            ICalCountSensor(
+                ical_events, DOMAIN + " " + name, period,
+                entry_id=config_entry.entry_id,
             )
+            for period in COUNT_PERIODS
         )
 
     async_add_entities(sensors)
 
+    async def _async_refresh(now=None):
+        """Refresh the feed and push the upcoming events to all sensors."""
+        await ical_events.update()
+        ical_events.async_update_listeners()
+
+    # The sensors show their restored state until the first refresh, so
+    # startup does not wait for the calendar server
+    config_entry.async_create_background_task(
+        hass, _async_refresh(), f"{DOMAIN} {name} first refresh"
+    )
+    config_entry.async_on_unload(
+        async_track_time_interval(hass, _async_refresh, SCAN_INTERVAL)
+    )
+
 
 # pylint: disable=too-few-public-methods
-class ICalSensor(SensorEntity):
+class ICalSensor(SensorEntity, RestoreEntity):
     """Implementation of a iCal sensor.
 
     Represents the Nth upcoming event.
     May have a name like 'sensor.mycalander_event_0' for the first
-    upcoming event.
+    upcoming event. The sensors of a calendar are not polled one by one;
+    ICalEvents pushes the upcoming events to all of them at once.
     """
 
+    _attr_should_poll = False
+    # The countdown changes every day and the text can be long; the state
+    # already names the event and its start
+    _unrecorded_attributes = frozenset({"eta", "description", "location"})
+
     def __init__(
         self, hass: HomeAssistant, ical_events, sensor_name, event_number,
         *, entry_id: str, date_format: str = DEFAULT_DATE_FORMAT,
+        description_length: int = DEFAULT_DESCRIPTION_LENGTH,
     ) -> None:
         """Initialize the sensor.
 
         sensor_name is typically the name of the calendar.
         eventnumber indicates which upcoming event this is, starting at zero
+        description_length caps the description attribute, the calendar
+        entity still returns the whole text
         """
         super().__init__()
         self._event_number = event_number
@@ -77,6 +124,7 @@ class ICalSensor(SensorEntity):
         self.ical_events = ical_events
         self._entry_id = entry_id
         self._date_format = date_format
+        self._description_length = description_length
         self._event_attributes = {
             "summary": None,
             "description": None,
@@ -87,6 +135,7 @@ class ICalSensor(SensorEntity):
         }
         self._state = None
         self._is_available = None
+        self._fingerprint = None
 
     @property
     def unique_id(self) -> str:
@@ -118,6 +167,36 @@ class ICalSensor(SensorEntity):
         """Return True if ZoneMinder is available."""
         return self.extra_state_attributes["start"] is not None
 
+    async def async_added_to_hass(self):
+        """Restore the last known event and start receiving updates."""
+        self.async_on_remove(
+            self.ical_events.async_add_listener(self._async_handle_upcoming)
+        )
+        if (last_state := await self.async_get_last_state()) is not None:
+            self._restore(last_state)
+
+    def _restore(self, last_state: State) -> None:
+        """Show the event from before the restart until the first refresh."""
+        if last_state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
+            return
+        attributes = last_state.attributes
+        for key in (*self._event_attributes, "all_day"):
+            value = attributes.get(key)
+            if key in ("start", "end") and isinstance(value, str):
+                value = dt_util.parse_datetime(value)
+            elif key == "description":
+                value = self._shorten(value)
+            self._event_attributes[key] = value
+        self._state = last_state.state
+        # Matches neither an event nor None, so the first refresh is shown
+        self._fingerprint = ()
+
+    @callback
+    def _async_handle_upcoming(self, upcoming):
+        """Show the event at this sensor's position, if anything changed."""
+        if self._set_event(self._pick(upcoming)):
+            self.async_write_ha_state()
+
     async def async_update(self):
         """Update the sensor."""
         _LOGGER.debug("Running ICalSensor async update for %s", self.name)
@@ -128,10 +207,39 @@ class ICalSensor(SensorEntity):
         # Sensors show upcoming events only — filter out past events
         now = dt_util.now()
         event_list = [e for e in all_events if e["end"] > now]
-        if event_list and (self._event_number < len(event_list)):
-            val = event_list[self._event_number]
-            name = val.get("summary", "Unknown")
+        self._set_event(self._pick(event_list))
+
+    def _pick(self, event_list):
+        """Return the event at this sensor's position in a list, if any."""
+        if self._event_number < len(event_list):
+            return event_list[self._event_number]
+        return None
+
+    def _shorten(self, description):
+        """Cut a description down to the configured length."""
+        limit = self._description_length
+        if not limit or description is None or len(description) <= limit:
+            return description
+        return description[:limit].rstrip() + "…"
+
+    def _set_event(self, val) -> bool:
+        """Show an event, or nothing, and return whether the state changed."""
+        if self._fingerprint == () and not self.ical_events.fetched:
+            # A restored event stays until a feed could be fetched, so a
+            # failing first refresh does not clear it
+            return False
+        if val is None:
+            fingerprint = None
+        else:
             start = val.get("start")
+            eta = (start - datetime.now(start.tzinfo) + timedelta(days=1)).days
+            fingerprint = (event_fingerprint(val), eta)
+        if fingerprint == self._fingerprint:
+            return False
+        self._fingerprint = fingerprint
+
+        if val is not None:
+            name = val.get("summary", "Unknown")
 
             # _LOGGER.debug(f"Val: {val}")
             _LOGGER.debug(
@@ -147,16 +255,16 @@ class ICalSensor(SensorEntity):
             self._event_attributes["start"] = val.get("start")
             self._event_attributes["end"] = val.get("end")
             self._event_attributes["location"] = val.get("location", "")
-            self._event_attributes["description"] = val.get("description", "")
-            self._event_attributes["eta"] = (
-                start - datetime.now(start.tzinfo) + timedelta(days=1)
-            ).days
+            self._event_attributes["description"] = self._shorten(
+                val.get("description", "")
+            )
+            self._event_attributes["eta"] = eta
             self._event_attributes["all_day"] = val.get("all_day")
             self._state = f"{name} - {start.strftime(self._date_format)}"
             if not val.get("all_day"):
                 self._state += f" {start.strftime('%H:%M')}"
             # self._is_available = True
-        elif self._event_number >= len(event_list):
+        else:
             # No further events are found in the calendar
             self._event_attributes = {
                 "summary": None,
@@ -168,3 +276,38 @@ class ICalSensor(SensorEntity):
             }
             self._state = None
             self._is_available = None
+        return True
+
+
+class ICalCountSensor(SensorEntity):
+    """Number of events today, tomorrow, this week or in the next 7 days.
+
+    Like the event sensors it receives every refresh. The count is looked
+    up in buckets ICalEvents builds once per refresh and day, and the state
+    is only written when it changed, so at a refresh or at midnight.
+    """
+
+    _attr_should_poll = False
+    _attr_icon = ICON
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, ical_events, sensor_name, period, *, entry_id: str) -> None:
+        """Initialize the sensor counting the events of a period."""
+        self.ical_events = ical_events
+        self._period = period
+        self._attr_name = f"{sensor_name} events {period.replace('_', ' ')}"
+        self._attr_unique_id = f"{entry_id}_count_{period}"
+
+    async def async_added_to_hass(self):
+        """Start receiving updates."""
+        self.async_on_remove(
+            self.ical_events.async_add_listener(self._async_handle_upcoming)
+        )
+
+    @callback
+    def _async_handle_upcoming(self, upcoming):
+        """Show the count of the period, if it changed."""
+        count = self.ical_events.event_count(self._period)
+        if count != self._attr_native_value:
+            self._attr_native_value = count
+            self.async_write_ha_state()
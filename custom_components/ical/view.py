@@ -0,0 +1,40 @@
+"""HTTP view serving the events of a calendar as an iCalendar document."""
+
+from http import HTTPStatus
+
+from aiohttp import hdrs, web
+
+from homeassistant.components.http import KEY_HASS, HomeAssistantView
+
+from .const import DOMAIN
+
+
+class ICalExportView(HomeAssistantView):
+    """Serve the merged and filtered events of a config entry as .ics.
+
+    Local tools can subscribe to this instead of fetching the upstream
+    feeds again. Requests need a Home Assistant access token. Clients
+    sending the ETag of their copy get a 304 while the events have not
+    changed.
+    """
+
+    url = f"/api/{DOMAIN}/{{entry_id}}.ics"
+    name = f"api:{DOMAIN}:export"
+
+    async def get(self, request: web.Request, entry_id: str) -> web.Response:
+        """Return the events of the entry, or 304 if the client has them."""
+        hass = request.app[KEY_HASS]
+        ical_events = hass.data.get(DOMAIN, {}).get(entry_id)
+        if ical_events is None:
+            return self.json_message("Calendar not found", HTTPStatus.NOT_FOUND)
+
+        body, etag = await ical_events.async_export()
+        headers = {hdrs.ETAG: etag, hdrs.CACHE_CONTROL: "no-cache"}
+        if etag in request.headers.get(hdrs.IF_NONE_MATCH, ""):
+            return web.Response(status=HTTPStatus.NOT_MODIFIED, headers=headers)
+        return web.Response(
+            body=body,
+            content_type="text/calendar",
+            charset="utf-8",
+            headers=headers,
+        )
@@ -1,4 +1,5 @@
 """Fixtures for iCal integration tests."""
+import asyncio
 import pytest
 from unittest.mock import MagicMock, AsyncMock
 from homeassistant.core import HomeAssistant
@@ -11,6 +12,9 @@ def mock_hass():
     """Mock Home Assistant instance."""
     hass = MagicMock(spec=HomeAssistant)
     hass.async_add_executor_job = AsyncMock()
+    hass.async_create_background_task = MagicMock(
+        side_effect=lambda target, name: asyncio.ensure_future(target)
+    )
     return hass
 
 
@@ -1,6 +1,7 @@
 """Tests for the calendar platform."""
 
-from datetime import date, datetime, timezone
+import asyncio
+from datetime import date, datetime, timedelta, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 from homeassistant.components.calendar import CalendarEvent
@@ -12,7 +13,11 @@ from custom_components.ical.calendar import ICalCalendarEventDevice, check_event
 @pytest.fixture
 def mock_hass():
     """Mock Home Assistant instance."""
-    return MagicMock()
+    hass = MagicMock()
+    hass.async_create_background_task = MagicMock(
+        side_effect=lambda target, name: asyncio.ensure_future(target)
+    )
+    return hass
 
 
 @pytest.fixture
@@ -333,3 +338,90 @@ async def test_calendar_device_async_update_timed_event(mock_hass):
     assert isinstance(device._event.start, datetime)
     assert isinstance(device._event.end, datetime)
     assert device._event.summary == "Timed Event"
+
+
+@pytest.mark.asyncio
+async def test_calendar_device_added_without_refresh(mock_hass, mock_ical_events):
+    """Test adding the entity subscribes to pushes instead of fetching."""
+    device = ICalCalendarEventDevice(
+        hass=mock_hass,
+        name="test_calendar",
+        entity_id="calendar.test_calendar",
+        ical_events=mock_ical_events,
+        unique_id="test_entry_id_calendar",
+    )
+    device.async_schedule_update_ha_state = MagicMock()
+
+    await device.async_added_to_hass()
+
+    mock_ical_events.async_add_listener.assert_called_once_with(
+        device._async_handle_upcoming
+    )
+    mock_ical_events.update.assert_not_called()
+    device.async_schedule_update_ha_state.assert_not_called()
+
+
+def test_calendar_device_writes_state_only_on_change(mock_hass, mock_ical_events):
+    """Test unchanged events are neither rebuilt nor written again."""
+    mock_ical_events.error = None
+    mock_ical_events.last_success = None
+    device = ICalCalendarEventDevice(
+        hass=mock_hass,
+        name="test_calendar",
+        entity_id="calendar.test_calendar",
+        ical_events=mock_ical_events,
+        unique_id="test_entry_id_calendar",
+    )
+    device.async_write_ha_state = MagicMock()
+
+    device._async_handle_upcoming([])
+    shown = device.event
+    mock_ical_events.event = dict(mock_ical_events.event)
+    mock_ical_events.last_success = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    device._async_handle_upcoming([])
+
+    assert device.async_write_ha_state.call_count == 1
+    assert device.event is shown
+
+    mock_ical_events.error = "Feed unavailable"
+    device._async_handle_upcoming([])
+    assert device.async_write_ha_state.call_count == 2
+
+    mock_ical_events.error = None
+    device._async_handle_upcoming([])
+    assert device.async_write_ha_state.call_count == 3
+
+
+def test_calendar_device_flips_offset_reached_on_time(mock_hass, mock_ical_events):
+    """Test offset_reached is set by a timer instead of on every update."""
+    start = datetime(2099, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    mock_ical_events.event = {
+        **mock_ical_events.event,
+        "summary": "Dentist !!-30",
+        "clean_summary": "Dentist",
+        "offset": timedelta(minutes=-30),
+        "start": start,
+        "end": start + timedelta(hours=1),
+    }
+    device = ICalCalendarEventDevice(
+        hass=mock_hass,
+        name="test_calendar",
+        entity_id="calendar.test_calendar",
+        ical_events=mock_ical_events,
+        unique_id="test_entry_id_calendar",
+    )
+    device.async_write_ha_state = MagicMock()
+
+    with patch(
+        "custom_components.ical.calendar.async_track_point_in_time"
+    ) as mock_track:
+        device._async_handle_upcoming([])
+
+    assert device.event.summary == "Dentist"
+    assert device.extra_state_attributes["offset_reached"] is False
+    _, reach_offset, when = mock_track.call_args.args
+    assert when == start - timedelta(minutes=30)
+
+    reach_offset(when)
+    assert device.extra_state_attributes["offset_reached"] is True
+    assert device.async_write_ha_state.call_count == 2
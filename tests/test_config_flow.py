@@ -1,10 +1,11 @@
 """Tests for the config flow."""
 from unittest.mock import AsyncMock, MagicMock, patch
+from aiohttp import ClientConnectionError, ClientResponseError
 import pytest
 from homeassistant import config_entries, data_entry_flow
 from homeassistant.core import HomeAssistant
 
-from custom_components.ical import config_flow
+from custom_components.ical import FeedLimitExceeded, config_flow
 from custom_components.ical.const import DOMAIN
 
 
@@ -15,38 +16,83 @@ def mock_setup_entry():
         yield
 
 
-def test_placeholder_hub():
-    """Test PlaceholderHub initialization."""
-    hub = config_flow.PlaceholderHub("test_host")
-    assert hub.host == "test_host"
-
-
-@pytest.mark.asyncio
-async def test_placeholder_hub_authenticate():
-    """Test PlaceholderHub authenticate method."""
-    hub = config_flow.PlaceholderHub("test_host")
-    result = await hub.authenticate("username", "password")
-    assert result is True
+PROBE = {"size": 2048, "components": 12, "occurrences": 40, "parse_time": 0.01}
 
 
 @pytest.mark.asyncio
 async def test_validate_input():
-    """Test validate_input function."""
-    # This is a placeholder test since the current validate_input doesn't do much
+    """Test validate_input probes the feed and suggests settings."""
     data = {
         "name": "Test Calendar",
-        "url": "https://example.com/calendar.ics"
+        "url": "https://example.com/calendar.ics",
+        "days": 365,
     }
-    
-    # Mock the PlaceholderHub
-    with patch("custom_components.ical.config_flow.PlaceholderHub") as mock_hub:
-        mock_hub_instance = MagicMock()
-        mock_hub_instance.authenticate = AsyncMock(return_value=True)
-        mock_hub.return_value = mock_hub_instance
-        
+
+    with patch(
+        "custom_components.ical.ICalEvents.async_probe",
+        AsyncMock(return_value=PROBE),
+    ):
         result = await config_flow.validate_input(MagicMock(), data)
-        assert result["title"] == "Test Calendar"
-        assert result["url"] == "https://example.com/calendar.ics"
+
+    assert result["title"] == "Test Calendar"
+    assert result["url"] == "https://example.com/calendar.ics"
+    assert result["probe"] == PROBE
+    assert result["suggested"] == {"update_interval": 120, "days": 365}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("error", "expected"),
+    [
+        (ClientResponseError(MagicMock(), (), status=401), config_flow.InvalidAuth),
+        (ClientResponseError(MagicMock(), (), status=500), config_flow.CannotConnect),
+        (ClientConnectionError(), config_flow.CannotConnect),
+        (FeedLimitExceeded("too big"), config_flow.FeedTooLarge),
+        (ValueError("not a calendar"), config_flow.InvalidFeed),
+    ],
+)
+async def test_validate_input_errors(error, expected):
+    """Test probe failures are reported as config flow errors."""
+    data = {"name": "Test Calendar", "url": "https://example.com/calendar.ics"}
+
+    with patch(
+        "custom_components.ical.ICalEvents.async_probe",
+        AsyncMock(side_effect=error),
+    ), pytest.raises(expected):
+        await config_flow.validate_input(MagicMock(), data)
+
+
+def test_suggest_settings_for_large_feed():
+    """Test slow, large or dense feeds get longer intervals and fewer days."""
+    probe = {"size": 4 * 1024 * 1024, "components": 9000, "occurrences": 8000, "parse_time": 3.1}
+
+    suggested = config_flow.suggest_settings(probe, 365)
+
+    assert suggested == {"update_interval": 4140, "days": 91}
+
+
+@pytest.mark.asyncio
+async def test_user_step_shows_probe_then_creates_entry():
+    """Test the user step shows the probe result before creating the entry."""
+    flow = config_flow.ConfigFlow()
+    flow.hass = MagicMock()
+    user_input = {"name": "Test Calendar", "url": "https://example.com/calendar.ics", "days": 365}
+
+    with patch(
+        "custom_components.ical.ICalEvents.async_probe",
+        AsyncMock(return_value=PROBE),
+    ):
+        result = await flow.async_step_user(user_input)
+
+    assert result["type"] == data_entry_flow.FlowResultType.FORM
+    assert result["step_id"] == "probe"
+    assert result["description_placeholders"]["size"] == "2"
+    assert result["description_placeholders"]["occurrences"] == "40"
+
+    result = await flow.async_step_probe({"update_interval": 600, "days": 30})
+
+    assert result["type"] == data_entry_flow.FlowResultType.CREATE_ENTRY
+    assert result["data"] == {**user_input, "update_interval": 600, "days": 30}
 
 
 # Skip the config flow tests for now as they require more complex setup
@@ -97,3 +143,19 @@ def test_config_flow_has_options_flow():
     mock_entry = MagicMock()
     handler = config_flow.ConfigFlow.async_get_options_flow(mock_entry)
     assert isinstance(handler, config_flow.OptionsFlowHandler)
+
+
+def test_regex_validator():
+    """Test filter options must be valid regular expressions."""
+    import voluptuous as vol
+
+    assert config_flow.regex("stand-?up|retro") == "stand-?up|retro"
+    with pytest.raises(vol.Invalid):
+        config_flow.regex("(unclosed")
+
+
+def test_suggest_settings_keeps_automatic_horizon():
+    """Test an automatic horizon is not replaced by a number of days."""
+    probe = {"size": 1024, "components": 10, "occurrences": 50000, "parse_time": 0.1}
+
+    assert config_flow.suggest_settings(probe, 0)["days"] == 0
@@ -1,6 +1,8 @@
 """Tests for the ICalEvents class."""
 
-from datetime import date, datetime, timezone
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+import re
 from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
@@ -12,6 +14,9 @@ def mock_hass():
     """Mock Home Assistant instance."""
     hass = MagicMock()
     hass.async_add_executor_job = AsyncMock()
+    hass.async_create_background_task = MagicMock(
+        side_effect=lambda target, name: asyncio.ensure_future(target)
+    )
     return hass
 
 
@@ -178,6 +183,29 @@ async def test_ical_event_dict_with_future_event(mock_hass, basic_config):
         assert result["end"].tzinfo is not None
 
 
+@pytest.mark.asyncio
+async def test_ical_event_dict_parses_offset(mock_hass, basic_config):
+    """Test the offset marker is parsed once into the event dict."""
+    ical_events = ICalEvents(hass=mock_hass, config=basic_config)
+
+    from_date = datetime(2023, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    start = datetime(2023, 1, 2, 12, 0, 0, tzinfo=timezone.utc)
+    end = datetime(2023, 1, 2, 13, 0, 0, tzinfo=timezone.utc)
+
+    with patch("homeassistant.util.dt.DEFAULT_TIME_ZONE", timezone.utc):
+        marked = ical_events._ical_event_dict(
+            start, end, from_date, {"SUMMARY": "Dentist !!-30"}
+        )
+        plain = ical_events._ical_event_dict(
+            start, end, from_date, {"SUMMARY": "Dentist"}
+        )
+
+    assert marked["summary"] == "Dentist !!-30"
+    assert marked["clean_summary"] == "Dentist"
+    assert marked["offset"] == timedelta(minutes=-30)
+    assert "clean_summary" not in plain and "offset" not in plain
+
+
 def test_check_event_with_regular_event():
     """Test check_event returns datetime for non-all-day events."""
     dt = datetime(2023, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
@@ -286,3 +314,1254 @@ async def test_ical_event_dict_all_day_event(mock_hass, basic_config):
 
     assert result is not None
     assert result["summary"] == "All Day Event"
+
+
+class _FakeStream:
+    """Minimal stand-in for aiohttp's StreamReader."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    async def iter_chunked(self, size):
+        for chunk in self._chunks:
+            yield chunk
+
+
+def _mock_session(chunks, charset=None):
+    """Build a mocked client session returning the given body chunks."""
+    response = MagicMock()
+    response.content = _FakeStream(chunks)
+    response.charset = charset
+    response.status = 200
+    response.headers = {}
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=response)
+    context.__aexit__ = AsyncMock(return_value=None)
+    session = MagicMock()
+    session.get = MagicMock(return_value=context)
+    return session
+
+
+@pytest.mark.asyncio
+async def test_fetch_streams_and_strips_nul_bytes(mock_hass, basic_config):
+    """Test remote feeds are read chunk by chunk into one cleaned buffer."""
+    config = {**basic_config, "url": "webcal://example.com/cal.ics"}
+    ical_events = ICalEvents(hass=mock_hass, config=config)
+    session = _mock_session([b"BEGIN:VCAL\x00", b"ENDAR\r\n\x00"], "latin-1")
+
+    with patch(
+        "custom_components.ical._async_get_session", return_value=session
+    ):
+        payload, charset, _, _ = await ical_events._async_fetch(ical_events.sources[0])
+
+    session.get.assert_called_once_with(
+        "https://example.com/cal.ics",
+        headers={},
+        timeout=ical_events.timeout,
+        ssl=True,
+    )
+    assert payload == b"BEGIN:VCALENDAR\r\n"
+    assert charset == "latin-1"
+
+
+def test_parse_payload_strips_nul_after_decoding():
+    """Test NULs that only appear after decoding (UTF-16) are removed."""
+    from custom_components.ical import _parse_payload
+
+    text = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nEND:VCALENDAR\r\n"
+    payload = bytearray(("\x00" + text).encode("utf-16-le"))
+
+    calendar = _parse_payload(payload, "utf-16-le")
+
+    assert calendar["VERSION"] == "2.0"
+
+
+@pytest.mark.asyncio
+async def test_fetch_keeps_zero_bytes_for_utf16(mock_hass, basic_config):
+    """Test UTF-16 bodies are not corrupted by byte-level NUL stripping."""
+    config = {**basic_config, "url": "https://example.com/cal.ics"}
+    ical_events = ICalEvents(hass=mock_hass, config=config)
+    body = "BEGIN:VCALENDAR\r\n".encode("utf-16-le")
+    session = _mock_session([body], "utf-16-le")
+
+    with patch(
+        "custom_components.ical._async_get_session", return_value=session
+    ):
+        payload, charset, _, _ = await ical_events._async_fetch(ical_events.sources[0])
+
+    assert payload == body
+    assert charset == "utf-16-le"
+
+
+@pytest.mark.asyncio
+async def test_fetch_aborts_when_feed_too_large(mock_hass, basic_config):
+    """Test the download stops once the size limit is crossed."""
+    from custom_components.ical import FeedLimitExceeded
+
+    config = {**basic_config, "url": "https://example.com/cal.ics", "max_feed_size": 1}
+    ical_events = ICalEvents(hass=mock_hass, config=config)
+    read = []
+
+    class _Stream:
+        async def iter_chunked(self, size):
+            for _ in range(10):
+                read.append(1)
+                yield b"x" * 600
+
+    session = _mock_session([])
+    session.get.return_value.__aenter__.return_value.content = _Stream()
+
+    with patch(
+        "custom_components.ical._async_get_session", return_value=session
+    ), pytest.raises(FeedLimitExceeded):
+        await ical_events._async_fetch(ical_events.sources[0])
+
+    assert len(read) == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_counts_components_across_chunks(mock_hass, basic_config):
+    """Test VEVENT markers split over chunk boundaries are counted once."""
+    from custom_components.ical import FeedLimitExceeded
+
+    config = {**basic_config, "url": "https://example.com/cal.ics", "max_components": 1}
+    ical_events = ICalEvents(hass=mock_hass, config=config)
+    session = _mock_session([b"BEGIN:VEV", b"ENT\r\nBEGIN:VEVENT"])
+
+    with patch(
+        "custom_components.ical._async_get_session", return_value=session
+    ), pytest.raises(FeedLimitExceeded):
+        await ical_events._async_fetch(ical_events.sources[0])
+
+    session = _mock_session([b"BEGIN:VEV", b"ENT\r\nEND:VEVENT"])
+    with patch(
+        "custom_components.ical._async_get_session", return_value=session
+    ):
+        payload, _, _, _ = await ical_events._async_fetch(ical_events.sources[0])
+    assert payload.count(b"BEGIN:VEVENT") == 1
+
+
+@pytest.mark.asyncio
+async def test_update_keeps_calendar_when_limit_exceeded(mock_hass, basic_config):
+    """Test the last good events are kept and the error is exposed."""
+    from custom_components.ical import FeedLimitExceeded
+
+    ical_events = ICalEvents(hass=mock_hass, config=basic_config)
+    previous = [
+        {
+            "summary": "Kept",
+            "start": datetime(2999, 1, 1, 12, 0, 0, tzinfo=timezone.utc),
+            "end": datetime(2999, 1, 1, 13, 0, 0, tzinfo=timezone.utc),
+            "location": None,
+            "description": None,
+            "all_day": False,
+        }
+    ]
+    ical_events.sources[0].events = previous
+    ical_events._async_fetch = AsyncMock(side_effect=FeedLimitExceeded("too big"))
+
+    await ical_events.update()
+
+    assert ical_events.calendar == previous
+    assert ical_events.error == "too big"
+
+
+@pytest.mark.asyncio
+async def test_update_keeps_events_of_feed_that_cannot_be_parsed(mock_hass, basic_config):
+    """Test a feed that is not iCalendar keeps its events and others merge."""
+    config = {**basic_config, "url": "https://a.example/a.ics https://b.example/b.ics"}
+    ical_events = ICalEvents(hass=mock_hass, config=config)
+    ical_events.sources[1].events = [_event("Cached", 8)]
+    today = datetime.now(timezone.utc)
+    feeds = {
+        "a": "BEGIN:VCALENDAR\r\n"
+        + _vevent("fresh", "SUMMARY:Fresh", f"DTSTART:{today:%Y%m%d}T100000Z")
+        + "END:VCALENDAR\r\n",
+        "b": "<html><body>Please sign in</body></html>\r\n",
+    }
+
+    async def fetch(source):
+        payload = bytearray(feeds[source.url[8]].encode())
+        return payload, "utf-8", source.url.encode(), (None, None)
+
+    ical_events._async_fetch = AsyncMock(side_effect=fetch)
+    mock_hass.async_add_executor_job = AsyncMock(
+        side_effect=lambda func, *args: func(*args)
+    )
+
+    await ical_events.update()
+
+    assert [e["summary"] for e in ical_events.calendar] == ["Cached", "Fresh"]
+    assert ical_events.error.startswith("Feed is not valid iCalendar")
+    assert ical_events.sources[1].digest is None
+
+
+def test_expand_occurrences_stops_at_limit():
+    """Test recurrence expansion aborts once the occurrence limit is hit."""
+    import icalendar
+
+    from custom_components.ical import FeedLimitExceeded, _expand_occurrences
+
+    calendar = icalendar.Calendar.from_ical(
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nBEGIN:VEVENT\r\nUID:daily\r\n"
+        "DTSTART:20230101T120000Z\r\nDTEND:20230101T130000Z\r\n"
+        "RRULE:FREQ=DAILY\r\nSUMMARY:Daily\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    assert len(_expand_occurrences(calendar, start, end, 365)) == 365
+    with pytest.raises(FeedLimitExceeded):
+        _expand_occurrences(calendar, start, end, 100)
+
+
+CUSTOM_VTIMEZONE_CALENDAR = """BEGIN:VCALENDAR
+VERSION:2.0
+BEGIN:VTIMEZONE
+TZID:Custom Zone
+BEGIN:DAYLIGHT
+TZOFFSETFROM:+0100
+TZOFFSETTO:+0200
+DTSTART:19700329T020000
+RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU
+END:DAYLIGHT
+BEGIN:STANDARD
+TZOFFSETFROM:+0200
+TZOFFSETTO:+0100
+DTSTART:19701025T030000
+RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU
+END:STANDARD
+END:VTIMEZONE
+BEGIN:VEVENT
+UID:custom-zone
+DTSTART;TZID=Custom Zone:20250101T090000
+DTEND;TZID=Custom Zone:20250101T100000
+SUMMARY:Custom zone event
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def _custom_zone():
+    """Return the pure Python tzinfo icalendar builds for a VTIMEZONE."""
+    import icalendar
+
+    calendar = icalendar.Calendar.from_ical(CUSTOM_VTIMEZONE_CALENDAR)
+    return next(iter(calendar.walk("VEVENT")))["DTSTART"].dt.tzinfo
+
+
+def test_as_local_matches_astimezone_across_transitions():
+    """Test cached conversions agree with astimezone, including DST edges."""
+    from zoneinfo import ZoneInfo
+
+    from custom_components.ical import _as_local
+
+    custom = _custom_zone()
+    local_tz = ZoneInfo("America/New_York")
+    first = datetime(2025, 3, 1, 0, 30, tzinfo=custom)
+
+    with patch("homeassistant.util.dt.DEFAULT_TIME_ZONE", local_tz):
+        for hour in range(0, 24 * 300, 7):
+            for fold in (0, 1):
+                value = (first + timedelta(hours=hour)).replace(fold=fold)
+                expected = value.astimezone(local_tz)
+                result = _as_local(value)
+                assert result == expected
+                assert result.utcoffset() == expected.utcoffset()
+
+
+def test_as_local_reuses_learned_interval():
+    """Test conversions inside a known interval skip the timezone rules."""
+    from zoneinfo import ZoneInfo
+
+    from custom_components.ical import _as_local
+
+    custom = _custom_zone()
+    with patch("homeassistant.util.dt.DEFAULT_TIME_ZONE", ZoneInfo("UTC")):
+        _as_local(datetime(2025, 6, 1, 9, 0, tzinfo=custom))
+        with patch.object(
+            type(custom), "utcoffset", side_effect=AssertionError
+        ):
+            result = _as_local(datetime(2025, 6, 8, 9, 0, tzinfo=custom))
+
+    assert result == datetime(2025, 6, 8, 7, 0, tzinfo=timezone.utc)
+
+
+def test_as_local_keeps_datetimes_already_in_local_zone():
+    """Test no conversion is done for values already in the local zone."""
+    from custom_components.ical import _as_local
+
+    value = datetime(2025, 6, 1, 9, 0, tzinfo=timezone.utc)
+    with patch("homeassistant.util.dt.DEFAULT_TIME_ZONE", timezone.utc):
+        assert _as_local(value) is value
+
+
+MIXED_CALENDAR = """BEGIN:VCALENDAR
+VERSION:2.0
+BEGIN:VEVENT
+UID:one-off
+DTSTART:20230105T120000Z
+DURATION:PT1H
+SUMMARY:One-off
+END:VEVENT
+BEGIN:VEVENT
+UID:old
+DTSTART:20220105T120000Z
+DTEND:20220105T130000Z
+SUMMARY:Outside window
+END:VEVENT
+BEGIN:VEVENT
+UID:weekly
+DTSTART:20230102T090000Z
+DTEND:20230102T100000Z
+RRULE:FREQ=WEEKLY;COUNT=3
+SUMMARY:Weekly
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def test_expand_occurrences_skips_engine_without_recurrence():
+    """Test calendars without series never reach the recurrence engine."""
+    import icalendar
+
+    from custom_components.ical import _expand_occurrences
+
+    calendar = icalendar.Calendar.from_ical(
+        MIXED_CALENDAR.replace("RRULE:FREQ=WEEKLY;COUNT=3\n", "")
+    )
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2023, 2, 1, tzinfo=timezone.utc)
+
+    with patch("recurring_ical_events.of") as mock_of:
+        occurrences = _expand_occurrences(calendar, start, end, 100)
+
+    mock_of.assert_not_called()
+    assert sorted(str(o["SUMMARY"]) for o in occurrences) == ["One-off", "Weekly"]
+    one_off = next(o for o in occurrences if o["UID"] == "one-off")
+    assert one_off["DTEND"].dt == datetime(2023, 1, 5, 13, 0, tzinfo=timezone.utc)
+
+
+def test_expand_occurrences_mixed_calendar():
+    """Test series are expanded while one-off events are filtered directly."""
+    import icalendar
+
+    from custom_components.ical import _expand_occurrences
+
+    calendar = icalendar.Calendar.from_ical(MIXED_CALENDAR)
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2023, 2, 1, tzinfo=timezone.utc)
+
+    occurrences = _expand_occurrences(calendar, start, end, 100)
+
+    summaries = [str(o["SUMMARY"]) for o in occurrences]
+    assert summaries.count("Weekly") == 3
+    assert summaries.count("One-off") == 1
+    assert "Outside window" not in summaries
+
+
+@pytest.mark.asyncio
+async def test_setup_and_unload_entry(mock_hass, basic_config):
+    """Test a config entry creates its ICalEvents and removes it on unload."""
+    from custom_components.ical import (
+        PLATFORMS,
+        async_setup_entry,
+        async_unload_entry,
+    )
+
+    mock_hass.data = {}
+    mock_hass.config_entries.async_forward_entry_setups = AsyncMock()
+    mock_hass.config_entries.async_unload_platforms = AsyncMock(return_value=True)
+    entry = MagicMock(entry_id="entry", data=basic_config, options={"days": 7})
+
+    assert await async_setup_entry(mock_hass, entry) is True
+    ical_events = mock_hass.data["ical"]["entry"]
+    assert isinstance(ical_events, ICalEvents)
+    assert ical_events.days == 7
+    mock_hass.config_entries.async_forward_entry_setups.assert_awaited_once_with(
+        entry, PLATFORMS
+    )
+
+    assert await async_unload_entry(mock_hass, entry) is True
+    assert mock_hass.data["ical"] == {}
+
+
+def _vevent(uid, *lines):
+    """Build a raw VEVENT block."""
+    return "\r\n".join(["BEGIN:VEVENT", f"UID:{uid}", *lines, "END:VEVENT", ""])
+
+
+def test_prefilter_payload_drops_blocks_outside_window():
+    """Test VEVENT blocks that cannot intersect the window are skipped."""
+    from custom_components.ical import _prefilter_payload
+
+    body = "".join(
+        [
+            "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n",
+            _vevent("past", "DTSTART:20200101T100000Z", "DTEND:20200101T110000Z"),
+            _vevent("future", "DTSTART;VALUE=DATE:20300101"),
+            _vevent("inside", "DTSTART;TZID=Europe/Oslo:20230110T100000", "DURATION:PT1H"),
+            _vevent("spanning", "DTSTART:20221201T100000Z", "DTEND:20230201T100000Z"),
+            _vevent("until", "DTSTART:20200101T100000Z", "RRULE:FREQ=DAILY;UNTIL=20200301T000000Z"),
+            _vevent("count", "DTSTART:20200101T100000Z", "RRULE:FREQ=WEEKLY;COUNT=5"),
+            _vevent("byday", "DTSTART:20200101T100000Z", "RRULE:FREQ=DAILY;COUNT=5;BYMONTH=1"),
+            _vevent("open", "DTSTART:20200101T100000Z", "RRULE:FREQ=YEARLY"),
+            _vevent("override", "RECURRENCE-ID:20200108T100000Z", "DTSTART:20200108T120000Z"),
+            _vevent("folded", "DTSTART:202301\r\n 15T100000Z"),
+            _vevent("monthly", "DTSTART:20220731T100000Z", "RRULE:FREQ=MONTHLY;COUNT=5"),
+            _vevent("leap", "DTSTART:20200229T100000Z", "RRULE:FREQ=YEARLY;COUNT=2"),
+            "END:VCALENDAR\r\n",
+        ]
+    )
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2023, 2, 1, tzinfo=timezone.utc)
+
+    result = bytes(_prefilter_payload(bytearray(body.encode()), start, end))
+
+    kept = set(re.findall(rb"^UID:(\w+)", result, re.M))
+    assert kept == {
+        b"inside", b"spanning", b"byday", b"open", b"override", b"folded",
+        # Months without a 31st and years without a 29 February are skipped
+        b"monthly", b"leap",
+    }
+    assert result.startswith(b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\n")
+    assert result.endswith(b"END:VCALENDAR\r\n")
+
+
+def test_prefilter_payload_returns_payload_when_nothing_dropped():
+    """Test no copy is made when every block may be relevant."""
+    from custom_components.ical import _prefilter_payload
+
+    body = "BEGIN:VCALENDAR\r\n" + _vevent("x", "DTSTART:20230105T100000Z")
+    payload = bytearray((body + "END:VCALENDAR\r\n").encode())
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2023, 2, 1, tzinfo=timezone.utc)
+
+    assert _prefilter_payload(payload, start, end) is payload
+
+
+def _event(summary, start_hour):
+    """Build a parsed event dict starting at the given hour."""
+    return {
+        "summary": summary,
+        "start": datetime(2023, 1, 1, start_hour, 0, 0, tzinfo=timezone.utc),
+        "end": datetime(2023, 1, 1, start_hour + 1, 0, 0, tzinfo=timezone.utc),
+        "location": None,
+        "description": None,
+        "all_day": False,
+    }
+
+
+def test_ical_events_splits_urls_into_sources(mock_hass, basic_config):
+    """Test a config entry can list several feeds."""
+    config = {
+        **basic_config,
+        "url": "https://a.example/cal.ics  webcal://b.example/cal.ics\nfile:///c.ics",
+    }
+    ical_events = ICalEvents(hass=mock_hass, config=config)
+
+    assert [source.url for source in ical_events.sources] == [
+        "https://a.example/cal.ics",
+        "https://b.example/cal.ics",
+        "file:///c.ics",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_update_merges_sources_and_reuses_unchanged(mock_hass, basic_config):
+    """Test sources are merged in order and unchanged feeds are not reparsed."""
+    config = {**basic_config, "url": "https://a.example/a.ics https://b.example/b.ics"}
+    ical_events = ICalEvents(hass=mock_hass, config=config)
+    parsed = {
+        b"a": [_event("A1", 8), _event("A2", 12)],
+        b"b": [_event("B1", 9), _event("B2", 10)],
+    }
+
+    async def fetch(source):
+        key = source.url[8:9].encode()
+        return bytearray(key), "utf-8", key, (None, None)
+
+    ical_events._async_fetch = AsyncMock(side_effect=fetch)
+    mock_hass.async_add_executor_job = AsyncMock(
+        side_effect=lambda func, payload, *args: bytes(payload)
+    )
+    ical_events._ical_parser = AsyncMock(
+        side_effect=lambda calendar, *args: parsed[calendar]
+    )
+
+    await ical_events._async_refresh_calendar()
+    assert [e["summary"] for e in ical_events.calendar] == ["A1", "B1", "B2", "A2"]
+    assert ical_events._ical_parser.call_count == 2
+
+    await ical_events._async_refresh_calendar()
+    assert ical_events._ical_parser.call_count == 2
+    assert [e["summary"] for e in ical_events.calendar] == ["A1", "B1", "B2", "A2"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_revalidates_with_etag(mock_hass, basic_config):
+    """Test a 304 answer reuses the events parsed before."""
+    config = {**basic_config, "url": "https://example.com/cal.ics"}
+    ical_events = ICalEvents(hass=mock_hass, config=config)
+    source = ical_events.sources[0]
+    source.etag = '"v1"'
+    source.digest = b"digest"
+    session = _mock_session([])
+    session.get.return_value.__aenter__.return_value.status = 304
+
+    with patch(
+        "custom_components.ical._async_get_session", return_value=session
+    ):
+        result = await ical_events._async_fetch(source)
+
+    assert result == (None, None, b"digest", ('"v1"', None))
+    session.get.assert_called_once_with(
+        "https://example.com/cal.ics",
+        headers={"If-None-Match": '"v1"'},
+        timeout=ical_events.timeout,
+        ssl=True,
+    )
+
+
+@pytest.mark.asyncio
+async def test_refresh_stores_validators_only_with_parsed_events(mock_hass, basic_config):
+    """Test a rejected payload is never revalidated as unchanged."""
+    from aiohttp import hdrs
+
+    from custom_components.ical import FeedInvalid
+
+    config = {**basic_config, "url": "https://validators.example/cal.ics"}
+    ical_events = ICalEvents(hass=mock_hass, config=config)
+    source = ical_events.sources[0]
+    mock_hass.async_add_executor_job = AsyncMock(
+        side_effect=lambda func, *args: func(*args)
+    )
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2023, 2, 1, tzinfo=timezone.utc)
+    sent = []
+
+    async def refresh(chunks, status=200):
+        session = _mock_session(chunks)
+        response = session.get.return_value.__aenter__.return_value
+        response.status = status
+        response.headers = {hdrs.ETAG: '"v1"'}
+        with patch(
+            "custom_components.ical._async_get_session", return_value=session
+        ):
+            try:
+                await ical_events._async_refresh_source(source, start, end)
+            finally:
+                sent.append(session.get.call_args.kwargs["headers"])
+
+    with pytest.raises(FeedInvalid):
+        await refresh([b"<html><body>Please sign in</body></html>"])
+    with pytest.raises(FeedInvalid, match="empty"):
+        await refresh([])
+    assert source.etag is None
+    assert source.last_success is None
+
+    body = "BEGIN:VCALENDAR\r\n" + _vevent("x", "DTSTART:20230105T100000Z")
+    await refresh([(body + "END:VCALENDAR\r\n").encode()])
+    await refresh([], status=304)
+
+    assert sent == [{}, {}, {}, {hdrs.IF_NONE_MATCH: '"v1"'}]
+    assert source.etag == '"v1"'
+    assert len(source.events) == 1
+
+
+def _copy(summary, uid, sequence=0, start_hour=9, series=False):
+    """Build an event dict as _ical_event_dict would for a given UID.
+
+    Only occurrences of a series carry a RECURRENCE-ID, their original start.
+    """
+    event = _event(summary, start_hour)
+    recurrence_id = event["start"] if series else None
+    event.update(uid=uid, recurrence_id=recurrence_id, sequence=sequence)
+    return event
+
+
+def test_deduplicate_prefers_highest_sequence():
+    """Test the most recent revision of a shared event is kept."""
+    from custom_components.ical import _deduplicate
+
+    organiser = [_copy("Old", "meeting", sequence=1), _copy("Own", "own", start_hour=11)]
+    attendee = [_copy("New", "meeting", sequence=2), _copy("Other", "other")]
+
+    result = _deduplicate([organiser, attendee], "sequence")
+
+    assert [e["summary"] for e in result[0]] == ["Own"]
+    assert [e["summary"] for e in result[1]] == ["New", "Other"]
+
+
+def test_deduplicate_by_source_order():
+    """Test earlier feeds win regardless of SEQUENCE."""
+    from custom_components.ical import _deduplicate
+
+    first = [_copy("First", "meeting", sequence=0)]
+    second = [_copy("Second", "meeting", sequence=5)]
+
+    result = _deduplicate([first, second], "source_order")
+
+    assert [e["summary"] for e in result[0]] == ["First"]
+    assert result[1] == []
+
+
+def test_deduplicate_keeps_other_occurrences_of_series():
+    """Test occurrences of one series with different RECURRENCE-IDs are kept."""
+    from custom_components.ical import _deduplicate
+
+    first = [
+        _copy("Mon", "series", start_hour=9, series=True),
+        _copy("Tue", "series", start_hour=10, series=True),
+    ]
+    second = [_copy("Mon", "series", start_hour=9, series=True)]
+
+    result = _deduplicate([first, second], "sequence")
+
+    assert [e["summary"] for e in result[0]] == ["Mon", "Tue"]
+    assert result[1] == []
+
+
+def test_update_listeners_pushes_upcoming_events(mock_hass, basic_config):
+    """Test listeners receive the first max_events events not yet ended."""
+    ical_events = ICalEvents(hass=mock_hass, config={**basic_config, "max_events": 2})
+    ical_events.calendar = [_event(name, hour) for name, hour in (
+        ("Past", 1), ("Now", 9), ("Later", 10), ("Last", 11),
+    )]
+    received = []
+    remove = ical_events.async_add_listener(received.append)
+
+    with patch("custom_components.ical.dt_util.now") as mock_now:
+        mock_now.return_value = datetime(2023, 1, 1, 9, 30, tzinfo=timezone.utc)
+        ical_events.async_update_listeners()
+        remove()
+        ical_events.async_update_listeners()
+
+    assert len(received) == 1
+    assert [e["summary"] for e in received[0]] == ["Now", "Later"]
+    assert ical_events.upcoming == received[0]
+
+
+@pytest.mark.asyncio
+async def test_refresh_peak_memory_is_bounded_by_payload_size(basic_config):
+    """Test raw text, parse tree and occurrences are not all kept at once."""
+    import tracemalloc
+
+    hass = MagicMock()
+
+    async def run_in_executor(func, *args):
+        return func(*args)
+
+    hass.async_add_executor_job = run_in_executor
+    config = {**basic_config, "url": "https://example.com/cal.ics"}
+    ical_events = ICalEvents(hass=hass, config=config)
+    body = "".join(
+        _vevent(
+            f"event{i}",
+            f"DTSTART:202301{i % 28 + 1:02d}T{i % 24:02d}0000Z",
+            "DURATION:PT1H",
+            "SUMMARY:Meeting",
+            "DESCRIPTION:" + "Agenda and notes " * 4,
+            "LOCATION:Room 1",
+        )
+        for i in range(500)
+    )
+    feed = f"BEGIN:VCALENDAR\r\n{body}END:VCALENDAR\r\n".encode()
+
+    async def fetch(source):
+        return bytearray(feed), "utf-8", source.url.encode(), (None, None)
+
+    ical_events._async_fetch = fetch
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2023, 3, 1, tzinfo=timezone.utc)
+    # A first refresh loads everything imported or cached lazily
+    await ical_events._async_refresh_source(ical_events.sources[0], start, end)
+    ical_events.sources[0].digest = None
+
+    tracemalloc.start()
+    try:
+        await ical_events._async_refresh_source(ical_events.sources[0], start, end)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(ical_events.sources[0].events) == 500
+    assert peak < 36 * len(feed)
+
+
+def test_import_does_not_load_parsing_stack():
+    """Test the parsers are only imported on first parse.
+
+    Runs a fresh interpreter with -X importtime, so a module that pulls
+    icalendar or recurring_ical_events back in at import time shows up here.
+    """
+    import os
+    import subprocess
+    import sys
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import custom_components.ical"],
+        cwd=root,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    imported = {
+        line.rsplit("|", 1)[-1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+    assert "custom_components.ical" in imported
+    assert "icalendar" not in imported
+    assert "recurring_ical_events" not in imported
+
+
+@pytest.mark.asyncio
+async def test_fetch_failure_backs_off_and_keeps_events(mock_hass, basic_config):
+    """Test a failing host is left alone for a while and old events are kept."""
+    import aiohttp
+
+    config = {**basic_config, "url": "https://down.example/cal.ics"}
+    ical_events = ICalEvents(hass=mock_hass, config=config)
+    source = ical_events.sources[0]
+    source.events = [_event("Cached", 9)]
+    ical_events._async_fetch = AsyncMock(
+        side_effect=aiohttp.ClientConnectionError("Connection refused")
+    )
+
+    with patch("custom_components.ical.monotonic", return_value=1000.0):
+        await ical_events._do_update()
+        await ical_events._do_update()
+
+    assert ical_events._async_fetch.call_count == 1
+    assert [e["summary"] for e in ical_events.calendar] == ["Cached"]
+    assert ical_events.error == "Connection refused, retrying in 60 s"
+    assert ical_events.last_success is None
+    assert not ical_events.fetched
+
+    ical_events._async_fetch = AsyncMock(return_value=(None, None, None, (None, None)))
+    with patch("custom_components.ical.monotonic", return_value=1061.0):
+        await ical_events._do_update()
+
+    assert ical_events.error is None
+    assert ical_events.last_success is not None
+    assert ical_events.fetched
+    assert source.breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_missing_feed_does_not_hold_back_host(mock_hass, basic_config):
+    """Test a 404 is an error of its feed, while a 503 backs off the host."""
+    import aiohttp
+
+    url = "https://shared.example/gone.ics?token=secret"
+    missing = ICalEvents(hass=mock_hass, config={**basic_config, "url": url})
+    valid = ICalEvents(
+        hass=mock_hass, config={**basic_config, "url": "https://shared.example/cal.ics"}
+    )
+
+    def status_error(status, message):
+        return aiohttp.ClientResponseError(
+            MagicMock(real_url=url), (), status=status, message=message
+        )
+
+    missing._async_fetch = AsyncMock(side_effect=status_error(404, "Not Found"))
+    valid._async_fetch = AsyncMock(return_value=(None, None, None, (None, None)))
+
+    with patch("custom_components.ical.monotonic", return_value=1000.0):
+        await missing._do_update()
+        await valid._do_update()
+
+    assert missing.error == "HTTP 404 Not Found"
+    assert missing.sources[0].breaker.failures == 0
+    assert valid._async_fetch.call_count == 1
+    assert valid.error is None
+
+    missing._async_fetch = AsyncMock(side_effect=status_error(503, "Service Unavailable"))
+    with patch("custom_components.ical.monotonic", return_value=1000.0):
+        await missing._do_update()
+        await valid._do_update()
+
+    assert missing.error == "HTTP 503 Service Unavailable, retrying in 60 s"
+    assert valid._async_fetch.call_count == 1
+    assert valid.error == missing.error
+
+
+def test_host_breaker_doubles_delay_up_to_cap():
+    """Test every further failure doubles the pause, up to the cap."""
+    from custom_components.ical import BACKOFF_MAX, _host_breaker
+
+    breaker = _host_breaker("https://Flaky.example/a.ics")
+    assert _host_breaker("https://flaky.example/b.ics") is breaker
+
+    delays = []
+    with patch("custom_components.ical.monotonic", return_value=0.0):
+        for _ in range(8):
+            breaker.record_failure(TimeoutError())
+            delays.append(breaker.retry_at)
+
+    assert delays[:3] == [60, 120, 240]
+    assert delays[-1] == BACKOFF_MAX
+    assert breaker.error == f"TimeoutError, retrying in {BACKOFF_MAX} s"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_updates_share_one_refresh(mock_hass, basic_config):
+    """Test callers arriving during a refresh wait for it instead of skipping."""
+    import asyncio
+
+    ical_events = ICalEvents(hass=mock_hass, config=basic_config, update_interval=120)
+    release = asyncio.Event()
+
+    async def refresh():
+        await release.wait()
+        ical_events.calendar = [_event("Fresh", 9)]
+
+    ical_events._do_update = AsyncMock(side_effect=refresh)
+
+    with patch("custom_components.ical.monotonic", return_value=1000.0):
+        callers = [asyncio.ensure_future(ical_events.update()) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert not any(caller.done() for caller in callers)
+        release.set()
+        await asyncio.gather(*callers)
+        await ical_events.update()
+
+    assert ical_events._do_update.call_count == 1
+    assert [e["summary"] for e in ical_events.calendar] == ["Fresh"]
+    # Home Assistant owns the shared refresh, so it is cancelled at shutdown
+    mock_hass.async_create_background_task.assert_called_once()
+    assert mock_hass.async_create_background_task.call_args.args[1] == (
+        "ical test_calendar refresh"
+    )
+
+    with patch("custom_components.ical.monotonic", return_value=1120.0):
+        await ical_events.update()
+
+    assert ical_events._do_update.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_updates_share_refresh_errors(mock_hass, basic_config):
+    """Test every waiting caller gets the error of the shared refresh."""
+    import asyncio
+
+    ical_events = ICalEvents(hass=mock_hass, config=basic_config)
+    ical_events._do_update = AsyncMock(side_effect=ValueError("broken feed"))
+
+    results = await asyncio.gather(
+        ical_events.update(), ical_events.update(), return_exceptions=True
+    )
+
+    assert ical_events._do_update.call_count == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_probe_reports_size_components_and_occurrences(mock_hass, basic_config):
+    """Test a probe fetches, parses and expands every feed without keeping it."""
+    config = {**basic_config, "url": "https://a.example/a.ics https://b.example/b.ics"}
+    ical_events = ICalEvents(hass=mock_hass, config=config)
+    today = datetime.now(timezone.utc)
+    start = f"DTSTART:{today:%Y%m%d}T100000Z"
+    feed = (
+        "BEGIN:VCALENDAR\r\n"
+        + _vevent("once", start, "DURATION:PT1H")
+        + _vevent("daily", start, "DURATION:PT1H", "RRULE:FREQ=DAILY;COUNT=3")
+        + "END:VCALENDAR\r\n"
+    ).encode()
+    ical_events._async_fetch = AsyncMock(
+        side_effect=lambda source: (bytearray(feed), "utf-8", b"digest", (None, None))
+    )
+    mock_hass.async_add_executor_job = AsyncMock(
+        side_effect=lambda func, *args: func(*args)
+    )
+
+    probe = await ical_events.async_probe()
+
+    assert probe["size"] == 2 * len(feed)
+    assert probe["components"] == 4
+    assert probe["occurrences"] == 8
+    assert probe["parse_time"] > 0
+    assert ical_events.calendar == []
+
+
+@pytest.mark.asyncio
+async def test_probe_fetches_whole_feed_after_refresh(mock_hass, basic_config):
+    """Test a probe never sends the validators stored by refreshes."""
+    config = {**basic_config, "url": "https://example.com/cal.ics"}
+    ical_events = ICalEvents(hass=mock_hass, config=config)
+    ical_events.sources[0].etag = '"v1"'
+    ical_events._async_fetch = AsyncMock(
+        return_value=(
+            bytearray(b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n"),
+            "utf-8",
+            b"",
+            (None, None),
+        )
+    )
+    mock_hass.async_add_executor_job = AsyncMock(return_value=(0, 0.0))
+
+    await ical_events.async_probe()
+
+    (probed,) = ical_events._async_fetch.call_args.args
+    assert probed is not ical_events.sources[0]
+    assert probed.etag is None
+
+
+@pytest.mark.asyncio
+async def test_feeds_share_one_client_until_last_entry_unloads():
+    """Test all entries fetch through one pooled client closed with the last."""
+    from custom_components.ical import (
+        FETCH_LIMIT_PER_HOST,
+        _async_get_session,
+        async_unload_entry,
+    )
+
+    hass = MagicMock()
+    hass.data = {"ical": {"one": MagicMock(), "two": MagicMock()}}
+    hass.config_entries.async_unload_platforms = AsyncMock(return_value=True)
+
+    session = _async_get_session(hass)
+    assert _async_get_session(hass) is session
+    assert session.connector.limit_per_host == FETCH_LIMIT_PER_HOST
+    hass.bus.async_listen_once.assert_called_once()
+
+    await async_unload_entry(hass, MagicMock(entry_id="one"))
+    assert not session.closed
+    await async_unload_entry(hass, MagicMock(entry_id="two"))
+    assert session.closed
+
+    assert _async_get_session(hass) is not session
+    hass.bus.async_listen_once.assert_called_once()
+    await hass.data["ical_session"].close()
+
+
+def test_verify_ssl_and_timeout_are_per_entry(mock_hass, basic_config):
+    """Test certificate checks and timeouts come from the entry options."""
+    config = {**basic_config, "verify_ssl": False, "timeout": 5}
+
+    ical_events = ICalEvents(hass=mock_hass, config=config)
+
+    assert ical_events.timeout.total == 5
+    assert ical_events.verify_ssl is False
+
+
+FILTER_CALENDAR = "".join(
+    [
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n",
+        _vevent(
+            "standup", "SUMMARY:Team standup", "CATEGORIES:Work,Team",
+            "DTSTART:20230102T090000Z", "DURATION:PT15M", "RRULE:FREQ=DAILY;COUNT=3",
+        ),
+        _vevent(
+            "standup", "SUMMARY:Cancelled standup", "RECURRENCE-ID:20230103T090000Z",
+            "DTSTART:20230103T090000Z", "DURATION:PT15M",
+        ),
+        _vevent(
+            "noise", "SUMMARY:Company broadcast", "CATEGORIES:All",
+            "DTSTART:20230102T080000Z", "DURATION:PT1H", "RRULE:FREQ=HOURLY",
+        ),
+        _vevent("lunch", "SUMMARY:Lunch", "LOCATION:Team kitchen", "DTSTART:20230102T120000Z"),
+        _vevent("other", "SUMMARY:Dentist", "DTSTART:20230102T150000Z"),
+        "END:VCALENDAR\r\n",
+    ]
+)
+
+
+def test_event_filter_rules():
+    """Test include, exclude and category rules on VEVENT components."""
+    import icalendar
+
+    from custom_components.ical import EventFilter
+
+    calendar = icalendar.Calendar.from_ical(FILTER_CALENDAR)
+    events = {
+        (e["UID"], "RECURRENCE-ID" in e): e for e in calendar.walk("VEVENT")
+    }
+    standup, cancelled = events["standup", False], events["standup", True]
+    noise, lunch = events["noise", False], events["lunch", False]
+
+    assert not EventFilter("", None, " , ")
+    team = EventFilter(include="team")
+    assert team.matches(standup) and team.matches(lunch) and not team.matches(noise)
+    assert not EventFilter(include="team", exclude="^cancel").matches(cancelled)
+    work = EventFilter(categories="work, home")
+    assert work.matches(standup) and not work.matches(lunch)
+
+
+def test_expand_occurrences_skips_filtered_series_before_expansion():
+    """Test excluded series are never expanded and overrides are checked."""
+    import icalendar
+
+    from custom_components.ical import EventFilter, _expand_occurrences
+
+    calendar = icalendar.Calendar.from_ical(FILTER_CALENDAR)
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2023, 2, 1, tzinfo=timezone.utc)
+
+    # The hourly broadcast alone would cross the occurrence limit
+    occurrences = _expand_occurrences(
+        calendar, start, end, 10, EventFilter(include="team", exclude="cancel")
+    )
+
+    assert sorted(str(o["SUMMARY"]) for o in occurrences) == [
+        "Lunch", "Team standup", "Team standup",
+    ]
+
+
+def test_expand_occurrences_keeps_recurrence_id_of_series_only():
+    """Test one-off events carry no RECURRENCE-ID, so reschedules match."""
+    import icalendar
+
+    from custom_components.ical import EventFilter, _deduplicate, _expand_occurrences
+
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2023, 2, 1, tzinfo=timezone.utc)
+    rescheduled = icalendar.Calendar.from_ical(
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+        + _vevent("lunch", "SUMMARY:Late lunch", "SEQUENCE:1", "DTSTART:20230102T130000Z")
+        + "END:VCALENDAR\r\n"
+    )
+
+    quiet = EventFilter(exclude="broadcast")
+    sources = [
+        _expand_occurrences(calendar, start, end, 100, quiet)
+        for calendar in (icalendar.Calendar.from_ical(FILTER_CALENDAR), rescheduled)
+    ]
+
+    assert {str(o["UID"]) for o in sources[0] if "RECURRENCE-ID" in o} == {"standup"}
+    assert "RECURRENCE-ID" not in sources[1][0]
+    sources = [
+        [
+            {
+                "uid": str(o["UID"]),
+                "recurrence_id": getattr(o.get("RECURRENCE-ID"), "dt", None),
+                "sequence": o.get("SEQUENCE", 0),
+                "summary": str(o["SUMMARY"]),
+            }
+            for o in occurrences
+        ]
+        for occurrences in sources
+    ]
+    result = _deduplicate(sources, "sequence")
+    assert sorted(e["summary"] for e in result[0] + result[1]) == [
+        "Cancelled standup", "Dentist", "Late lunch", "Team standup", "Team standup",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_update_shares_event_text(mock_hass, basic_config):
+    """Test occurrences and feeds repeating a text share one plain str."""
+    config = {**basic_config, "url": "https://a.example/a.ics https://b.example/b.ics"}
+    ical_events = ICalEvents(hass=mock_hass, config=config)
+    today = datetime.now(timezone.utc)
+    start = f"DTSTART:{today:%Y%m%d}T100000Z"
+    text = ("SUMMARY:Sync", "LOCATION:Room 1", "DESCRIPTION:" + "Agenda " * 50)
+    feeds = {
+        "a": _vevent("daily", start, "DURATION:PT1H", "RRULE:FREQ=DAILY;COUNT=3", *text)
+        + _vevent("once", start, "DURATION:PT2H", *text),
+        "b": _vevent("other", start, "DURATION:PT3H", *text),
+    }
+
+    async def fetch(source):
+        body = f"BEGIN:VCALENDAR\r\n{feeds[source.url[8]]}END:VCALENDAR\r\n"
+        return bytearray(body.encode()), "utf-8", source.url.encode(), (None, None)
+
+    ical_events._async_fetch = AsyncMock(side_effect=fetch)
+    mock_hass.async_add_executor_job = AsyncMock(
+        side_effect=lambda func, *args: func(*args)
+    )
+
+    await ical_events.update()
+
+    assert len(ical_events.calendar) == 5
+    for key in ("summary", "location", "description"):
+        values = {id(event[key]) for event in ical_events.calendar}
+        assert len(values) == 1
+        assert type(ical_events.calendar[0][key]) is str
+    assert ical_events._strings == {}
+
+
+@pytest.mark.asyncio
+async def test_export_is_built_once_per_refresh(mock_hass, basic_config):
+    """Test the export is reused until the events change."""
+    ical_events = ICalEvents(hass=mock_hass, config=basic_config)
+    mock_hass.async_add_executor_job = AsyncMock(
+        side_effect=lambda func, *args: func(*args)
+    )
+    daily = {**_event("Daily", 8), "uid": "daily", "sequence": 0}
+    daily["recurrence_id"] = daily["start"]
+    ical_events.calendar = [daily, {**_event("Lunch", 12), "location": "Kitchen"}]
+
+    body, etag = await ical_events.async_export()
+    assert await ical_events.async_export() == (body, etag)
+    assert mock_hass.async_add_executor_job.call_count == 1
+
+    # A refresh with the same events keeps the bytes and the ETag
+    ical_events.calendar = list(ical_events.calendar)
+    again, same = await ical_events.async_export()
+    assert again is body and same == etag
+
+    ical_events.calendar = ical_events.calendar[:1]
+    _, changed = await ical_events.async_export()
+    assert changed != etag
+
+    assert body.count(b"BEGIN:VEVENT") == 2
+    assert b"UID:daily-20230101T080000\r\n" in body
+    assert b"DTSTART:20230101T120000Z\r\n" in body
+    assert b"LOCATION:Kitchen\r\n" in body
+    assert b"RECURRENCE-ID" not in body
+    assert body.count(b"DTSTAMP:") == 2
+
+
+@pytest.mark.asyncio
+async def test_export_suffixes_uid_of_series_occurrences_only(mock_hass, basic_config):
+    """Test a one-off event keeps the UID of the feed in the export."""
+    ical_events = ICalEvents(hass=mock_hass, config=basic_config)
+    today = datetime.now(timezone.utc)
+    start = f"DTSTART:{today:%Y%m%d}T100000Z"
+    body = (
+        "BEGIN:VCALENDAR\r\n"
+        + _vevent("daily", start, "DURATION:PT1H", "RRULE:FREQ=DAILY;COUNT=2")
+        + _vevent("once", start, "DURATION:PT2H")
+        + "END:VCALENDAR\r\n"
+    )
+    ical_events._async_fetch = AsyncMock(
+        return_value=(bytearray(body.encode()), "utf-8", b"digest", (None, None))
+    )
+    mock_hass.async_add_executor_job = AsyncMock(
+        side_effect=lambda func, *args: func(*args)
+    )
+
+    await ical_events.update()
+    export, _ = await ical_events.async_export()
+
+    tomorrow = today + timedelta(days=1)
+    assert b"UID:once\r\n" in export
+    assert f"UID:daily-{today:%Y%m%d}T100000\r\n".encode() in export
+    assert f"UID:daily-{tomorrow:%Y%m%d}T100000\r\n".encode() in export
+
+
+def test_counts_use_timestamp_index(mock_hass, basic_config):
+    """Test counting events over periods, instants and days."""
+    ical_events = ICalEvents(hass=mock_hass, config=basic_config)
+    ical_events.calendar = [
+        _event("Early", 8),
+        {**_event("Long", 9), "end": datetime(2023, 1, 3, 10, tzinfo=timezone.utc)},
+        _event("Late", 10),
+    ]
+    at = datetime(2023, 1, 1, 9, 30, tzinfo=timezone.utc)
+
+    assert ical_events.count_events(at, at + timedelta(hours=1)) == 2
+    assert ical_events.count_events(at - timedelta(hours=2), at) == 2
+    assert ical_events.count_events_at(at) == 1
+    assert ical_events.count_events_at(datetime(2023, 1, 1, 10, tzinfo=timezone.utc)) == 2
+
+    with patch("homeassistant.util.dt.DEFAULT_TIME_ZONE", timezone.utc):
+        assert ical_events.daily_counts(date(2022, 12, 31), 5) == [0, 3, 1, 1, 0]
+
+    # Replacing the events rebuilds the index
+    ical_events.calendar = ical_events.calendar[:1]
+    assert ical_events.count_events_at(at) == 0
+
+
+def test_event_count_buckets(mock_hass, basic_config):
+    """Test the counts of the count sensors and when they are rebuilt."""
+    ical_events = ICalEvents(hass=mock_hass, config=basic_config)
+
+    def event(summary, day, last_day=None):
+        return {
+            **_event(summary, 9),
+            "start": datetime(2023, 1, day, 9, tzinfo=timezone.utc),
+            "end": datetime(2023, 1, last_day or day, 10, tzinfo=timezone.utc),
+        }
+
+    ical_events.calendar = [event("Monday", 2), event("Trip", 4, 6), event("Next", 10)]
+    # Wednesday 4 January 2023
+    now = datetime(2023, 1, 4, 8, tzinfo=timezone.utc)
+
+    with patch("homeassistant.util.dt.DEFAULT_TIME_ZONE", timezone.utc), patch(
+        "homeassistant.util.dt.now", return_value=now
+    ):
+        assert ical_events.event_count("today") == 1
+        assert ical_events.event_count("tomorrow") == 1
+        assert ical_events.event_count("this_week") == 2
+        assert ical_events.event_count("next_7_days") == 2
+        buckets = ical_events._buckets
+        assert ical_events.event_count("today") == 1
+        assert ical_events._buckets is buckets
+
+    with patch("homeassistant.util.dt.DEFAULT_TIME_ZONE", timezone.utc), patch(
+        "homeassistant.util.dt.now", return_value=now + timedelta(days=6)
+    ):
+        assert ical_events.event_count("today") == 1
+        assert ical_events.event_count("this_week") == 1
+
+
+@pytest.mark.asyncio
+async def test_auto_horizon_grows_until_enough_events(mock_hass, basic_config):
+    """Test days set to 0 expands only as far as max_events needs."""
+    import icalendar
+
+    ical_events = ICalEvents(
+        hass=mock_hass, config={**basic_config, "days": 0, "max_events": 3}
+    )
+    mock_hass.async_add_executor_job = AsyncMock(
+        side_effect=lambda func, *args: func(*args)
+    )
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0)
+    start = f"DTSTART:{today + timedelta(days=1):%Y%m%d}T100000Z"
+    from_date, to_date = today - timedelta(days=30), today + timedelta(days=365)
+
+    def parse(rrule):
+        return icalendar.Calendar.from_ical(
+            "BEGIN:VCALENDAR\r\n"
+            + _vevent("series", start, "DURATION:PT1H", rrule)
+            + "END:VCALENDAR\r\n"
+        )
+
+    daily = await ical_events._ical_parser(
+        parse("RRULE:FREQ=DAILY"), from_date, to_date
+    )
+    assert len(daily) == 6
+    assert mock_hass.async_add_executor_job.call_count == 1
+
+    ical_events.max_events = 5
+    monthly = await ical_events._ical_parser(
+        parse("RRULE:FREQ=MONTHLY"), from_date, to_date
+    )
+    # 7, 28 and 112 days hold fewer than 5, 365 are the most looked ahead
+    assert len(monthly) == 12
+    assert mock_hass.async_add_executor_job.call_count == 5
+
+
+@pytest.mark.asyncio
+async def test_auto_horizon_does_not_count_events_ending_today(mock_hass, basic_config):
+    """Test the cached events still fill max_events once today's have ended."""
+    import icalendar
+
+    ical_events = ICalEvents(
+        hass=mock_hass, config={**basic_config, "days": 0, "max_events": 2}
+    )
+    mock_hass.async_add_executor_job = AsyncMock(
+        side_effect=lambda func, *args: func(*args)
+    )
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0)
+    from_date, to_date = today - timedelta(days=30), today + timedelta(days=365)
+    calendar = icalendar.Calendar.from_ical(
+        "BEGIN:VCALENDAR\r\n"
+        + _vevent("today", f"DTSTART:{today:%Y%m%d}T220000Z", "DURATION:PT1H",
+                  "RRULE:FREQ=HOURLY;COUNT=2")
+        + _vevent("soon", f"DTSTART:{today + timedelta(days=3):%Y%m%d}T100000Z")
+        + _vevent("later", f"DTSTART:{today + timedelta(days=20):%Y%m%d}T100000Z")
+        + "END:VCALENDAR\r\n"
+    )
+
+    events = await ical_events._ical_parser(calendar, from_date, to_date)
+
+    # Both of today's events are over by tomorrow, so 7 days are not enough
+    assert len(events) == 4
+    assert mock_hass.async_add_executor_job.call_count == 2
@@ -4,7 +4,7 @@ from datetime import datetime, timedelta, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
-from custom_components.ical.sensor import ICalSensor
+from custom_components.ical.sensor import ICalCountSensor, ICalSensor
 
 
 @pytest.fixture
@@ -310,3 +310,154 @@ async def test_sensor_async_update_filters_past_events(mock_hass):
 
     # Sensor should show the future event, skipping the past one
     assert sensor._event_attributes["summary"] == "Future Event"
+
+
+def test_sensor_writes_state_only_when_changed(mock_hass, mock_ical_events):
+    """Test pushed events only cause a state write when the sensor changes."""
+    sensor = ICalSensor(
+        hass=mock_hass,
+        ical_events=mock_ical_events,
+        sensor_name="test_calendar",
+        event_number=1,
+        entry_id="test_entry_id",
+    )
+    sensor.async_write_ha_state = MagicMock()
+    first, second = mock_ical_events.calendar
+
+    sensor._async_handle_upcoming([first, second])
+    sensor._async_handle_upcoming([first, second])
+    assert sensor.async_write_ha_state.call_count == 1
+    assert sensor._event_attributes["summary"] == "Test Event 2"
+
+    sensor._async_handle_upcoming([second])
+    assert sensor.async_write_ha_state.call_count == 2
+    assert sensor.available is False
+
+
+@pytest.mark.asyncio
+async def test_sensor_restores_last_state(mock_hass, mock_ical_events):
+    """Test a sensor shows its state from before a restart until refreshed."""
+    from homeassistant.core import State
+
+    sensor = ICalSensor(
+        hass=mock_hass,
+        ical_events=mock_ical_events,
+        sensor_name="test_calendar",
+        event_number=0,
+        entry_id="test_entry_id",
+    )
+    last_state = State(
+        "sensor.ical_test_calendar_event_0",
+        "Test Event 1 - 1 January 2023 12:00",
+        {
+            "summary": "Test Event 1",
+            "description": "Test Description 1",
+            "location": "Test Location 1",
+            "start": "2023-01-01T12:00:00+00:00",
+            "end": "2023-01-01T13:00:00+00:00",
+            "eta": 3,
+            "all_day": False,
+        },
+    )
+
+    with patch.object(
+        sensor, "async_get_last_state", AsyncMock(return_value=last_state)
+    ):
+        await sensor.async_added_to_hass()
+
+    mock_ical_events.update.assert_not_called()
+    mock_ical_events.async_add_listener.assert_called_once()
+    assert sensor.state == "Test Event 1 - 1 January 2023 12:00"
+    assert sensor._event_attributes["start"] == datetime(
+        2023, 1, 1, 12, 0, 0, tzinfo=timezone.utc
+    )
+    assert sensor.available is True
+
+    # A first refresh that fetched nothing keeps the restored event
+    sensor.async_write_ha_state = MagicMock()
+    mock_ical_events.fetched = False
+    sensor._async_handle_upcoming([])
+    assert sensor.state == "Test Event 1 - 1 January 2023 12:00"
+    sensor.async_write_ha_state.assert_not_called()
+
+    mock_ical_events.fetched = True
+    sensor._async_handle_upcoming([])
+    assert sensor.available is False
+    sensor.async_write_ha_state.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_sensor_does_not_restore_unavailable_state(mock_hass, mock_ical_events):
+    """Test a sensor that had no event stays empty after a restart."""
+    from homeassistant.core import State
+
+    sensor = ICalSensor(
+        hass=mock_hass,
+        ical_events=mock_ical_events,
+        sensor_name="test_calendar",
+        event_number=4,
+        entry_id="test_entry_id",
+    )
+    last_state = State("sensor.ical_test_calendar_event_4", "unavailable")
+
+    with patch.object(
+        sensor, "async_get_last_state", AsyncMock(return_value=last_state)
+    ):
+        await sensor.async_added_to_hass()
+
+    assert sensor.state is None
+    assert sensor.available is False
+
+
+@pytest.mark.asyncio
+async def test_sensor_shortens_description(mock_hass, mock_ical_events):
+    """Test the description attribute is cut to the configured length."""
+    mock_ical_events.calendar[0]["description"] = "Dial in " * 100
+    sensor = ICalSensor(
+        hass=mock_hass,
+        ical_events=mock_ical_events,
+        sensor_name="test_calendar",
+        event_number=0,
+        entry_id="test_entry_id",
+        description_length=20,
+    )
+
+    with patch("custom_components.ical.sensor.dt_util") as mock_dt_util:
+        mock_dt_util.now.return_value = datetime(2023, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+        await sensor.async_update()
+
+    assert sensor.extra_state_attributes["description"] == "Dial in Dial in Dial…"
+    assert len(mock_ical_events.calendar[0]["description"]) == 800
+
+
+def test_sensor_unrecorded_attributes(mock_hass, mock_ical_events):
+    """Test the countdown and long texts are kept out of the recorder."""
+    sensor = ICalSensor(
+        hass=mock_hass,
+        ical_events=mock_ical_events,
+        sensor_name="test_calendar",
+        event_number=0,
+        entry_id="test_entry_id",
+    )
+
+    assert {"eta", "description", "location"} <= sensor._unrecorded_attributes
+    assert "summary" not in sensor._unrecorded_attributes
+
+
+def test_count_sensor_writes_only_changed_counts():
+    """Test a count sensor shows the count of its period."""
+    ical_events = MagicMock()
+    ical_events.event_count.return_value = 3
+    sensor = ICalCountSensor(
+        ical_events, "ical test_calendar", "next_7_days", entry_id="test_entry_id"
+    )
+    sensor.async_write_ha_state = MagicMock()
+
+    sensor._async_handle_upcoming([])
+    sensor._async_handle_upcoming([])
+
+    ical_events.event_count.assert_called_with("next_7_days")
+    assert sensor.native_value == 3
+    assert sensor.async_write_ha_state.call_count == 1
+    assert sensor.name == "ical test_calendar events next 7 days"
+    assert sensor.unique_id == "test_entry_id_count_next_7_days"
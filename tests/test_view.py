@@ -0,0 +1,59 @@
+"""Test the iCalendar export view."""
+
+from http import HTTPStatus
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from homeassistant.components.http import KEY_HASS
+
+from custom_components.ical.view import ICalExportView
+
+
+def _request(hass, headers=None):
+    """Build a request for the view."""
+    request = MagicMock()
+    request.app = {KEY_HASS: hass}
+    request.headers = headers or {}
+    return request
+
+
+@pytest.fixture
+def export_hass():
+    """Home Assistant with one calendar to export."""
+    ical_events = MagicMock()
+    ical_events.async_export = AsyncMock(
+        return_value=(b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n", '"abc"')
+    )
+    hass = MagicMock()
+    hass.data = {"ical": {"entry": ical_events}}
+    return hass
+
+
+@pytest.mark.asyncio
+async def test_export_view_serves_calendar(export_hass):
+    """Test the document is served with its ETag."""
+    response = await ICalExportView().get(_request(export_hass), "entry")
+
+    assert response.status == HTTPStatus.OK
+    assert response.content_type == "text/calendar"
+    assert response.headers["ETag"] == '"abc"'
+    assert response.body == b"BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n"
+
+
+@pytest.mark.asyncio
+async def test_export_view_not_modified(export_hass):
+    """Test a client with the current copy gets a 304 without a body."""
+    request = _request(export_hass, {"If-None-Match": '"abc"'})
+
+    response = await ICalExportView().get(request, "entry")
+
+    assert response.status == HTTPStatus.NOT_MODIFIED
+    assert response.body is None
+
+
+@pytest.mark.asyncio
+async def test_export_view_unknown_entry(export_hass):
+    """Test an unknown entry is a 404."""
+    response = await ICalExportView().get(_request(export_hass), "other")
+
+    assert response.status == HTTPStatus.NOT_FOUND